@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from .server import StubServer, SyntheticCTF
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+# modules that must never be loaded by a given command
+FORBIDDEN = {
+  "help": ["aiohttp", "pyperclip", "requests", "urwid", "yaml"],
+  "submit": ["aiohttp", "pyperclip", "urwid", "yaml"],
+}
+
+RUNNER = """
+import json, os, sys
+from rctf_client.cli import rctf
+try:
+  rctf(prog_name="rctf")
+except SystemExit:
+  pass
+with open(os.environ["RCTF_IMPORTS_OUTPUT"], "w") as f:
+  json.dump(sorted(sys.modules), f)
+"""
+
+def run(args, cwd, repeat):
+  times = []
+  with tempfile.NamedTemporaryFile(suffix=".json") as output:
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT), "RCTF_IMPORTS_OUTPUT": output.name}
+    for _ in range(repeat):
+      start = time.perf_counter()
+      subprocess.run([sys.executable, "-c", RUNNER, *args],
+        cwd=cwd, env=env, check=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+      )
+      times.append(time.perf_counter() - start)
+    with open(output.name) as f:
+      modules = json.load(f)
+  return statistics.median(times), modules
+
+def check(name, args, cwd, budget, repeat):
+  elapsed, modules = run(args, cwd, repeat)
+  loaded = sorted(module for module in FORBIDDEN[name] if module in modules)
+  ok = elapsed <= budget and not loaded
+  print(f"rctf {' '.join(args):24} {elapsed:.3f}s (budget {budget:.3f}s){' imports ' + ', '.join(loaded) if loaded else ''}  {'ok' if ok else 'FAIL'}")
+  return ok
+
+def main():
+  parser = argparse.ArgumentParser(description="Check the import time budget of the rctf CLI")
+  parser.add_argument("-n", "--repeat", type=int, default=5, help="runs per command, the median is reported")
+  parser.add_argument("--help-budget", type=float, default=0.25, help="seconds allowed for rctf --help")
+  parser.add_argument("--submit-budget", type=float, default=0.4, help="seconds allowed for rctf submit")
+  args = parser.parse_args()
+
+  server = StubServer(SyntheticCTF(challenges=1, file_size=0, teams=1)).start()
+  try:
+    with tempfile.TemporaryDirectory() as tmp:
+      ctf_root = pathlib.Path(tmp)
+      challenge_dir = ctf_root / "misc" / "challenge"
+      challenge_dir.mkdir(parents=True)
+      with open(ctf_root / ".rctf.json", "w") as f:
+        json.dump({
+          "url": server.url,
+          "token": "benchmark-auth-token",
+          "challenge_dirs": {"misc/challenge": "chall-0"},
+        }, f)
+      ok = check("help", ["--help"], ctf_root, args.help_budget, args.repeat)
+      ok &= check("submit", ["submit", "flag{benchmark}"], challenge_dir, args.submit_budget, args.repeat)
+  finally:
+    server.stop()
+  if not ok:
+    sys.exit(1)
+
+if __name__ == "__main__":
+  main()
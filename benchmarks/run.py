@@ -0,0 +1,180 @@
+import argparse
+import contextlib
+import json
+import os
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from click.testing import CliRunner
+
+from rctf_client.cli import rctf
+from rctf_client.client import RCTFClient
+from rctf_client.download import Downloader
+
+from .server import StubServer, SyntheticCTF
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+BENCHMARKS = []
+
+def benchmark(unit, higher_is_better=False):
+  def decorator(fn):
+    BENCHMARKS.append((fn.__name__, fn, unit, higher_is_better))
+    return fn
+  return decorator
+
+def timed(fn, repeat):
+  times = []
+  for _ in range(repeat):
+    start = time.perf_counter()
+    fn()
+    times.append(time.perf_counter() - start)
+  return statistics.median(times)
+
+@contextlib.contextmanager
+def chdir(path):
+  cwd = os.getcwd()
+  os.chdir(path)
+  try:
+    yield
+  finally:
+    os.chdir(cwd)
+
+class Environment:
+  def __init__(self, server, repeat):
+    self.server = server
+    self.repeat = repeat
+    self.tmp = tempfile.TemporaryDirectory()
+    self.ctf_root = pathlib.Path(self.tmp.name).resolve()
+    self.config = {"url": server.url, "token": "benchmark-auth-token"}
+    with open(self.ctf_root / ".rctf.json", "w") as f:
+      json.dump(self.config, f)
+
+  def client(self):
+    return RCTFClient(self.server.url, self.config["token"])
+
+  def run_cli(self, *args):
+    with chdir(self.ctf_root):
+      result = CliRunner().invoke(rctf, list(args), catch_exceptions=False)
+    if result.exit_code != 0:
+      raise RuntimeError(f"rctf {' '.join(args)} failed: {result.output}")
+
+  def run_cli_process(self, *args):
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+    subprocess.run(
+      [sys.executable, "-c", "from rctf_client.cli import rctf; rctf(prog_name='rctf')", *args],
+      cwd=self.ctf_root, env=env, check=True,
+      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+@benchmark("s")
+def cold_start_help(env):
+  return timed(lambda: env.run_cli_process("--help"), env.repeat)
+
+@benchmark("s")
+def cold_start_submit(env):
+  return timed(lambda: env.run_cli_process("challenges", "submit", "chall-0", "flag{benchmark}"), env.repeat)
+
+@benchmark("s")
+def challenges_list(env):
+  return timed(lambda: env.run_cli("challenges", "list", "-s", "-f", "json"), env.repeat)
+
+@benchmark("s")
+def challenges_show(env):
+  challenge = env.server.ctf.challenges[-1]["id"]
+  return timed(lambda: env.run_cli("challenges", "show", challenge, "-f", "json"), env.repeat)
+
+@benchmark("MiB/s", higher_is_better=True)
+def download_throughput(env):
+  client = env.client()
+  challenges = client.get_challenges()
+  size = sum(len(content) for content in env.server.ctf.files.values())
+  def download():
+    with tempfile.TemporaryDirectory() as root:
+      Downloader(client.session, jobs=4).download(pathlib.Path(root), dict(env.config), challenges)
+  return size / (1 << 20) / timed(download, env.repeat)
+
+@benchmark("teams/s", higher_is_better=True)
+def scoreboard_paging(env):
+  client = env.client()
+  total = len(env.server.ctf.leaderboard)
+  return total / timed(lambda: sum(1 for _ in client.iter_scoreboard()), env.repeat)
+
+@benchmark("s")
+def gui_tabs(env):
+  from rctf_client.gui import GUI
+  def build():
+    # pages are built on first selection and load in the background, visit
+    # every tab and wait until their requests are done and widgets are built
+    gui = GUI(env.client(), dict(env.config), env.ctf_root)
+    for tab in range(len(gui.tabs)):
+      gui.select_tab(tab)
+    gui.worker.drain()
+    gui.worker.shutdown()
+  return timed(build, env.repeat)
+
+def compare(results, baseline, tolerance):
+  regressions = []
+  for name, result in results["benchmarks"].items():
+    if name not in baseline["benchmarks"]:
+      continue
+    old, new = baseline["benchmarks"][name]["value"], result["value"]
+    change = (new - old) / old if old else 0
+    if result["higher_is_better"]:
+      change = -change
+    marker = ""
+    if change > tolerance:
+      regressions.append(name)
+      marker = "  REGRESSION"
+    print(f"{name:24} {old:12.4f} -> {new:12.4f} {result['unit']:8} ({change:+.1%} worse){marker}")
+  return regressions
+
+def main():
+  parser = argparse.ArgumentParser(description="Benchmark rctf-client against a local stand-in rCTF server")
+  parser.add_argument("-k", "--select", action="append", default=[], help="only run benchmarks containing this string")
+  parser.add_argument("-n", "--repeat", type=int, default=5, help="runs per benchmark, the median is reported")
+  parser.add_argument("--challenges", type=int, default=50)
+  parser.add_argument("--file-size", type=int, default=1 << 20)
+  parser.add_argument("--teams", type=int, default=10000)
+  parser.add_argument("--latency", type=float, default=0.005, help="seconds added to every request")
+  parser.add_argument("-o", "--output", type=pathlib.Path, help="write results to this JSON file")
+  parser.add_argument("-c", "--compare", type=pathlib.Path, help="compare against a previous results file")
+  parser.add_argument("-t", "--tolerance", type=float, default=0.2, help="relative slowdown counted as a regression")
+  args = parser.parse_args()
+
+  ctf = SyntheticCTF(challenges=args.challenges, file_size=args.file_size, teams=args.teams)
+  server = StubServer(ctf, latency=args.latency).start()
+  env = Environment(server, args.repeat)
+  results = {
+    "python": platform.python_version(),
+    "parameters": {k: v for k, v in vars(args).items() if k in ["challenges", "file_size", "teams", "latency", "repeat"]},
+    "benchmarks": {},
+  }
+  try:
+    for name, fn, unit, higher_is_better in BENCHMARKS:
+      if args.select and not any(s in name for s in args.select):
+        continue
+      value = fn(env)
+      results["benchmarks"][name] = {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+      print(f"{name:24} {value:12.4f} {unit}")
+  finally:
+    server.stop()
+    env.tmp.cleanup()
+
+  if args.output:
+    with open(args.output, "w") as f:
+      json.dump(results, f, indent=2)
+  if args.compare:
+    with open(args.compare) as f:
+      baseline = json.load(f)
+    print()
+    if compare(results, baseline, args.tolerance):
+      sys.exit(1)
+
+if __name__ == "__main__":
+  main()
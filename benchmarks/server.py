@@ -0,0 +1,213 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+CATEGORIES = ["crypto", "misc", "pwn", "rev", "web"]
+
+class SyntheticCTF:
+  def __init__(self, challenges=50, files=1, file_size=1 << 20, teams=10000, graph_points=500, seed=0):
+    rng = random.Random(seed)
+    self.config = {
+      "ctfName": "Benchmark CTF",
+      "divisions": {"open": "Open", "student": "Student"},
+      "userMembers": True,
+    }
+    self.challenges = []
+    self.files = {}
+    for i in range(challenges):
+      challenge = {
+        "id": f"chall-{i}",
+        "name": f"challenge {i}",
+        "category": CATEGORIES[i % len(CATEGORIES)],
+        "author": "bench",
+        "description": "lorem ipsum " * 50,
+        "points": rng.randint(50, 500),
+        "solves": rng.randint(0, teams),
+        "sortWeight": 0,
+        "files": [],
+      }
+      for j in range(files):
+        content = bytes([i % 256, j % 256]) * (file_size // 2)
+        digest = hashlib.sha256(content).hexdigest()
+        url = f"/uploads/{digest}/file-{i}-{j}.bin"
+        self.files[url] = content
+        challenge["files"].append({"name": f"file-{i}-{j}.bin", "url": url})
+      self.challenges.append(challenge)
+    self.leaderboard = [
+      {"id": f"team-{i}", "name": f"team {i}", "score": 100000 - i * 7}
+      for i in range(teams)
+    ]
+    start = 1600000000000
+    self.graph = [
+      {
+        "id": team["id"],
+        "name": team["name"],
+        "points": [
+          {"time": start + k * 60000, "score": team["score"] * k // graph_points}
+          for k in range(graph_points)
+        ],
+      }
+      for team in self.leaderboard[:10]
+    ]
+    self.solves = [
+      {"id": challenge["id"], "name": challenge["name"], "category": challenge["category"],
+       "points": challenge["points"], "solves": challenge["solves"], "createdAt": start}
+      for challenge in self.challenges[::3]
+    ]
+
+  def profile(self, team):
+    return {
+      "id": team["id"],
+      "name": team["name"],
+      "email": "bench@example.com",
+      "division": "open",
+      "allowedDivisions": ["open", "student"],
+      "score": team["score"],
+      "globalPlace": 1,
+      "divisionPlace": 1,
+      "teamToken": "benchmark-team-token",
+      "solves": self.solves,
+    }
+
+class StubHandler(BaseHTTPRequestHandler):
+  protocol_version = "HTTP/1.1"
+  # headers and body go out in separate writes, without this every reused
+  # keep-alive connection stalls on Nagle and delayed ACKs
+  disable_nagle_algorithm = True
+
+  def log_message(self, *args):
+    pass
+
+  def _send(self, status, body, headers={}):
+    self.send_response(status)
+    for k, v in headers.items():
+      self.send_header(k, v)
+    self.send_header("Content-Length", str(len(body)))
+    self.end_headers()
+    if self.command != "HEAD":
+      self.wfile.write(body)
+
+  def _api(self, kind, data=None, status=200, message=""):
+    body = json.dumps({"kind": kind, "message": message, "data": data}).encode()
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    if self.headers.get("If-None-Match") == etag:
+      return self._send(304, b"", {"ETag": etag})
+    self._send(status, body, {"Content-Type": "application/json", "ETag": etag})
+
+  def _file(self, content):
+    headers = {"Accept-Ranges": "bytes", "ETag": f'"{hashlib.sha1(content[:64]).hexdigest()}"'}
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range", ""))
+    if match:
+      start = int(match.group(1) or 0)
+      end = int(match.group(2)) if match.group(2) else len(content) - 1
+      if start >= len(content):
+        return self._send(416, b"", {"Content-Range": f"bytes */{len(content)}"})
+      headers["Content-Range"] = f"bytes {start}-{end}/{len(content)}"
+      return self._send(206, content[start:end + 1], headers)
+    self._send(200, content, headers)
+
+  def _dispatch(self):
+    ctf = self.server.ctf
+    time.sleep(self.server.latency)
+    length = int(self.headers.get("Content-Length") or 0)
+    body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+    url = urllib.parse.urlparse(self.path)
+    query = {k: v[0] for k, v in urllib.parse.parse_qs(url.query).items()}
+    path, method = url.path, self.command
+    if path in ctf.files:
+      return self._file(ctf.files[path])
+    if not path.startswith("/api/v1"):
+      return self._send(404, b"")
+    path = path[len("/api/v1"):]
+
+    if path == "/integrations/client/config":
+      return self._api("goodClientConfig", ctf.config)
+    if path == "/auth/login" and method == "POST":
+      return self._api("goodLogin", {"authToken": "benchmark-auth-token"})
+    if path == "/challs":
+      return self._api("goodChallenges", ctf.challenges)
+    match = re.fullmatch(r"/challs/([^/]+)/(solves|submit)", path)
+    if match:
+      if match.group(2) == "submit":
+        if body.get("flag") == "flag{benchmark}":
+          return self._api("goodFlag")
+        return self._api("badFlag", status=400, message="The flag was incorrect.")
+      offset, limit = int(query.get("offset", 0)), int(query.get("limit", 10))
+      solves = [{"id": f"solve-{i}", "userId": team["id"], "userName": team["name"], "createdAt": 0}
+        for i, team in enumerate(ctf.leaderboard[offset:offset + limit])]
+      return self._api("goodChallengeSolves", {"solves": solves})
+    if path == "/users/me" and method == "GET":
+      return self._api("goodUserData", ctf.profile(ctf.leaderboard[0]))
+    if path == "/users/me" and method == "PATCH":
+      return self._api("goodUserUpdate", {"user": ctf.profile(ctf.leaderboard[0])})
+    if path == "/users/me/members":
+      if method == "POST":
+        return self._api("goodMemberCreate", {"id": "member", "email": body.get("email")})
+      return self._api("goodMemberData", [])
+    if path.startswith("/users/me/members/"):
+      return self._api("goodMemberDelete")
+    if path.startswith("/users/"):
+      uuid = urllib.parse.unquote(path[len("/users/"):])
+      team = next((team for team in ctf.leaderboard if team["id"] == uuid), None)
+      if team is None:
+        return self._api("badUnknownUser", status=404, message="The user does not exist.")
+      return self._api("goodUserData", ctf.profile(team))
+    if path == "/leaderboard/now":
+      offset, limit = int(query.get("offset", 0)), int(query.get("limit", 100))
+      return self._api("goodLeaderboard", {
+        "total": len(ctf.leaderboard),
+        "leaderboard": ctf.leaderboard[offset:offset + limit],
+      })
+    if path == "/leaderboard/graph":
+      return self._api("goodLeaderboard", {"graph": ctf.graph[:int(query.get("limit", 10))]})
+    return self._api("badEndpoint", status=404, message="The endpoint does not exist.")
+
+  do_GET = do_HEAD = do_POST = do_PATCH = do_PUT = do_DELETE = _dispatch
+
+class StubServer(socketserver.ThreadingMixIn, HTTPServer):
+  daemon_threads = True
+
+  def __init__(self, ctf, latency=0, port=0):
+    self.ctf = ctf
+    self.latency = latency
+    super().__init__(("127.0.0.1", port), StubHandler)
+
+  @property
+  def url(self):
+    return f"http://127.0.0.1:{self.server_address[1]}"
+
+  def start(self):
+    thread = threading.Thread(target=self.serve_forever, daemon=True)
+    thread.start()
+    return self
+
+  def stop(self):
+    self.shutdown()
+    self.server_close()
+
+def main():
+  parser = argparse.ArgumentParser(description="Stand-in rCTF API server serving a synthetic CTF")
+  parser.add_argument("--port", type=int, default=8000)
+  parser.add_argument("--challenges", type=int, default=50)
+  parser.add_argument("--files", type=int, default=1)
+  parser.add_argument("--file-size", type=int, default=1 << 20)
+  parser.add_argument("--teams", type=int, default=10000)
+  parser.add_argument("--latency", type=float, default=0, help="seconds added to every request")
+  args = parser.parse_args()
+  ctf = SyntheticCTF(args.challenges, args.files, args.file_size, args.teams)
+  server = StubServer(ctf, args.latency, args.port)
+  print(f"Serving {server.url}")
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+
+if __name__ == "__main__":
+  main()
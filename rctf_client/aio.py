@@ -0,0 +1,218 @@
+import asyncio
+import json
+import time
+import urllib
+
+try:
+  import aiohttp
+except ImportError:
+  aiohttp = None
+
+from .cache import FileCache
+from .client import API_VERSION, RETRY_STATUSES, _handle_response
+from .trace import RequestTrace
+
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE", "OPTIONS", "TRACE")
+
+async def _paginate(fetch, key, page_size):
+  # fetch the next page in the background while the caller consumes this one
+  offset = 0
+  task = asyncio.ensure_future(fetch(page_size, offset))
+  try:
+    while True:
+      data = await task
+      page = data[key]
+      offset += len(page)
+      done = len(page) < page_size or offset >= data.get("total", float("inf"))
+      if not done:
+        task = asyncio.ensure_future(fetch(page_size, offset))
+      for entry in page:
+        yield entry
+      if done:
+        return
+  finally:
+    task.cancel()
+
+class AsyncRCTFClient:
+  def __init__(self, url, token=None, pool_size=100, concurrency=100, retries=3, backoff_factor=0.5, config_cache=None, config_ttl=3600, hooks=None):
+    if aiohttp is None:
+      raise ImportError("AsyncRCTFClient requires aiohttp, install rctf-client[async]")
+    if not urllib.parse.urlparse(url).scheme in ["http", "https"]:
+      raise ValueError(f"Invalid URL: {url}")
+    self.url = url
+    self.token = token
+    self.pool_size = pool_size
+    self.concurrency = concurrency
+    self.retries = retries
+    self.backoff_factor = backoff_factor
+    self.config_cache = FileCache(config_cache, config_ttl) if config_cache else None
+    self.hooks = list(hooks or [])
+    self.session = None
+    self.config = None
+
+  async def open(self):
+    if self.session is None:
+      self.session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=self.pool_size),
+      )
+      self._semaphore = asyncio.Semaphore(self.concurrency)
+      try:
+        self.config = await self._config()
+      except:
+        await self.close()
+        raise
+    return self
+
+  async def close(self):
+    if self.session is not None:
+      await self.session.close()
+      self.session = None
+
+  async def __aenter__(self):
+    return await self.open()
+
+  async def __aexit__(self, *exc):
+    await self.close()
+
+  async def _request(self, method, endpoint, *args, **data):
+    path = endpoint.format(*(urllib.parse.quote(arg) for arg in args))
+    start = time.perf_counter()
+    status, size, body = await self._send(method, path, data)
+    if self.hooks:
+      kind = body.get("kind") if isinstance(body, dict) else None
+      trace = RequestTrace(method, endpoint, status, kind, size, time.perf_counter() - start)
+      for hook in self.hooks:
+        hook(trace)
+    return body
+
+  async def _send(self, method, path, data):
+    if self.session is None:
+      raise RuntimeError("AsyncRCTFClient is not open")
+    url = urllib.parse.urljoin(self.url, f"/api/{API_VERSION}{path}")
+
+    if data:
+      data = {k: v for k, v in data.items() if v is not None}
+
+    headers = {}
+    if self.token:
+      headers["Authorization"] = f"Bearer {self.token}"
+
+    if method == "GET":
+      kwargs = {"params": {k: str(v) for k, v in data.items()}}
+    else:
+      kwargs = {"json": data}
+
+    attempt = 0
+    async with self._semaphore:
+      while True:
+        retry = attempt < self.retries
+        try:
+          async with self.session.request(method, url, headers=headers, **kwargs) as resp:
+            if not (retry and method in IDEMPOTENT_METHODS and resp.status in RETRY_STATUSES):
+              content = await resp.read()
+              return resp.status, len(content), json.loads(content)
+        except aiohttp.ClientConnectorError:
+          # the request never reached the server, so any method is safe to retry
+          if not retry:
+            raise
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+          if not (retry and method in IDEMPOTENT_METHODS):
+            raise
+        await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+        attempt += 1
+
+  async def _config(self):
+    if self.config_cache:
+      config = self.config_cache.get(self.url)
+      if config is not None:
+        return config
+    response = await self._request("GET", "/integrations/client/config")
+    config = _handle_response(response, ["goodClientConfig"])
+    if self.config_cache:
+      self.config_cache.set(self.url, config)
+    return config
+
+  async def login(self, token):
+    response = await self._request("POST", "/auth/login",
+      teamToken=token,
+    )
+    self.token = _handle_response(response, ["goodLogin"])["authToken"]
+
+  async def get_challenges(self):
+    response = await self._request("GET", "/challs")
+    return _handle_response(response, ["goodChallenges"])
+
+  async def get_solves(self, chall, limit=10, offset=0):
+    response = await self._request("GET", "/challs/{}/solves", chall,
+      limit=limit,
+      offset=offset,
+    )
+    return _handle_response(response, ["goodChallengeSolves"])
+
+  def iter_solves(self, chall, page_size=100):
+    fetch = lambda limit, offset: self.get_solves(chall, limit=limit, offset=offset)
+    return _paginate(fetch, "solves", page_size)
+
+  async def submit_flag(self, chall, flag):
+    response = await self._request("POST", "/challs/{}/submit", chall,
+      flag=flag,
+    )
+    return _handle_response(response, ["goodFlag"])
+
+  async def get_members(self):
+    response = await self._request("GET", "/users/me/members")
+    return _handle_response(response, ["goodMemberData"])
+
+  async def add_member(self, email):
+    response = await self._request("POST", "/users/me/members",
+      email=email
+    )
+    return _handle_response(response, ["goodMemberCreate"])
+
+  async def remove_member(self, member):
+    response = await self._request("DELETE", "/users/me/members/{}", member)
+    return _handle_response(response, ["goodMemberDelete"])
+
+  async def private_profile(self):
+    response = await self._request("GET", "/users/me")
+    return _handle_response(response, ["goodUserData"])
+
+  async def public_profile(self, uuid):
+    response = await self._request("GET", "/users/{}", uuid)
+    return _handle_response(response, ["goodUserData"])
+
+  async def update_account(self, name=None, division=None):
+    response = await self._request("PATCH", "/users/me",
+      name=name,
+      division=division,
+    )
+    return _handle_response(response, ["goodUserUpdate"])
+
+  async def update_email(self, email):
+    response = await self._request("PUT", "/users/me/auth/email",
+      email=email,
+    )
+    return _handle_response(response, ["goodVerifyEmailSent", "goodEmailSet"], message=True)
+
+  async def delete_email(self):
+    response = await self._request("DELETE", "/users/me/auth/email")
+    return _handle_response(response, ["goodEmailRemoved", "badEmailNoExists"], message=True)
+
+  async def get_scoreboard(self, division=None, limit=100, offset=0):
+    response = await self._request("GET", "/leaderboard/now",
+      division=division,
+      limit=limit,
+      offset=offset,
+    )
+    return _handle_response(response, ["goodLeaderboard"])
+
+  def iter_scoreboard(self, division=None, page_size=100):
+    fetch = lambda limit, offset: self.get_scoreboard(division=division, limit=limit, offset=offset)
+    return _paginate(fetch, "leaderboard", page_size)
+
+  async def get_graph(self, division=None, limit=10):
+    response = await self._request("GET", "/leaderboard/graph",
+      division=division,
+      limit=limit,
+    )
+    return _handle_response(response, ["goodLeaderboard"])
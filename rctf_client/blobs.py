@@ -0,0 +1,56 @@
+import os
+import pathlib
+import shutil
+import stat
+import tempfile
+
+def default_blob_dir():
+  if "RCTF_BLOB_DIR" in os.environ:
+    return pathlib.Path(os.environ["RCTF_BLOB_DIR"])
+  cache = os.environ.get("XDG_CACHE_HOME") or pathlib.Path.home() / ".cache"
+  return pathlib.Path(cache) / "rctf" / "blobs"
+
+def _place(source, target):
+  # hardlink source to target, copying when links are not possible (another
+  # filesystem, or one without hardlinks), and replace target atomically
+  fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+  os.close(fd)
+  os.unlink(tmp)
+  try:
+    try:
+      os.link(source, tmp)
+    except OSError:
+      shutil.copyfile(source, tmp)
+    os.replace(tmp, target)
+  except:
+    if os.path.exists(tmp):
+      os.unlink(tmp)
+    raise
+
+class BlobStore:
+  # attachments shared between challenges and CTF roots, stored by SHA-256
+  def __init__(self, path=None):
+    self.path = pathlib.Path(path) if path else default_blob_dir()
+    self.path.mkdir(parents=True, exist_ok=True)
+
+  def blob(self, sha256):
+    return self.path / sha256[:2] / sha256
+
+  def has(self, sha256):
+    return self.blob(sha256).is_file()
+
+  def add(self, path, sha256):
+    blob = self.blob(sha256)
+    if blob.is_file():
+      # already stored, share it instead of keeping a second copy
+      self.link(sha256, path)
+      return
+    blob.parent.mkdir(exist_ok=True)
+    _place(path, blob)
+    # files are shared through hardlinks, so an in-place edit in one
+    # challenge directory would change every copy
+    mode = blob.stat().st_mode
+    os.chmod(blob, mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+  def link(self, sha256, path):
+    _place(self.blob(sha256), path)
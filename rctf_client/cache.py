@@ -0,0 +1,175 @@
+import hashlib
+import json
+import pathlib
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+
+from .util import atomic_write
+
+class FileCache:
+  def __init__(self, path, ttl):
+    self.path = path
+    self.ttl = ttl
+
+  def _load(self):
+    try:
+      with open(self.path) as f:
+        return json.load(f)
+    except (OSError, ValueError):
+      return {}
+
+  def get(self, key):
+    entry = self._load().get(key)
+    if entry is None or time.time() - entry["time"] > self.ttl:
+      return None
+    return entry["data"]
+
+  def set(self, key, data):
+    entries = self._load()
+    entries[key] = {"time": time.time(), "data": data}
+    try:
+      atomic_write(self.path, json.dumps(entries))
+    except OSError:
+      pass
+
+DEFAULT_TTLS = {
+  "/challs": 30,
+  "/leaderboard/now": 15,
+  "/users/me": 10,
+}
+
+class ResponseCache:
+  def __init__(self, max_entries=128, path=None, ttls=None):
+    self.max_entries = max_entries
+    self.path = pathlib.Path(path) if path else None
+    self.ttls = DEFAULT_TTLS if ttls is None else ttls
+    self.entries = OrderedDict()
+    self.lock = threading.Lock()
+    if self.path:
+      self.path.mkdir(parents=True, exist_ok=True)
+      # index what is already on disk, oldest first; bodies load on first use
+      files = []
+      for fp in self.path.glob("*.json"):
+        try:
+          files.append((fp.stat().st_mtime, fp.stem))
+        except OSError:
+          # removed by another process clearing the cache
+          continue
+      for _, key in sorted(files):
+        self.entries[key] = None
+      self._evict()
+
+  def cacheable(self, endpoint):
+    return endpoint in self.ttls
+
+  def ttl(self, endpoint):
+    return self.ttls[endpoint]
+
+  def key(self, url, params, token):
+    query = urllib.parse.urlencode(sorted(params.items())) if params else ""
+    return hashlib.sha256(f"{token}\n{url}?{query}".encode()).hexdigest()
+
+  def get(self, key):
+    with self.lock:
+      if key not in self.entries:
+        # another process sharing the backend may have stored it
+        if not (self.path and (self.path / f"{key}.json").is_file()):
+          return None
+        self.entries[key] = None
+        self._evict()
+      self.entries.move_to_end(key)
+      entry = self.entries[key]
+      if entry is None:
+        try:
+          with open(self.path / f"{key}.json") as f:
+            entry = json.load(f)
+        except (OSError, ValueError):
+          del self.entries[key]
+          return None
+        self.entries[key] = entry
+      return entry
+
+  def set(self, key, entry):
+    with self.lock:
+      self.entries[key] = entry
+      self.entries.move_to_end(key)
+      self._evict()
+      if self.path:
+        try:
+          atomic_write(self.path / f"{key}.json", json.dumps(entry))
+        except OSError:
+          pass
+
+  def clear(self):
+    with self.lock:
+      self.entries.clear()
+      if self.path:
+        for fp in self.path.glob("*.json"):
+          try:
+            fp.unlink()
+          except OSError:
+            pass
+
+  def _evict(self):
+    while len(self.entries) > self.max_entries:
+      self._remove(next(iter(self.entries)))
+
+  def _remove(self, key):
+    del self.entries[key]
+    if self.path:
+      try:
+        (self.path / f"{key}.json").unlink()
+      except OSError:
+        pass
+
+class _Call:
+  def __init__(self):
+    self.done = threading.Event()
+    self.time = None
+    self.result = None
+    self.error = None
+
+class SingleFlight:
+  def __init__(self, window=0):
+    self.window = window
+    self.calls = {}
+    self.lock = threading.Lock()
+
+  def do(self, key, fn):
+    # returns (result, shared), shared is True when another caller made the request
+    with self.lock:
+      self._prune()
+      call = self.calls.get(key)
+      leader = call is None
+      if leader:
+        call = self.calls[key] = _Call()
+    if not leader:
+      call.done.wait()
+      if call.error is not None:
+        raise call.error
+      return call.result, True
+    try:
+      call.result = fn()
+    except BaseException as e:
+      call.error = e
+      raise
+    finally:
+      call.time = time.monotonic()
+      call.done.set()
+      with self.lock:
+        if call.error is not None and self.calls.get(key) is call:
+          del self.calls[key]
+        self._prune()
+    return call.result, False
+
+  def _prune(self):
+    # results are only shared for window seconds, don't hold on to them after
+    now = time.monotonic()
+    for key in [key for key, call in self.calls.items() if call.done.is_set() and now - call.time >= self.window]:
+      del self.calls[key]
+
+  def forget(self):
+    with self.lock:
+      self.calls = {key: call for key, call in self.calls.items() if not call.done.is_set()}
@@ -3,50 +3,122 @@ import traceback
 import click
 import json
 import pathlib
+import signal
 
-from ..client import RCTFClient
-from ..exceptions import APIError
-from ..gui import GUI
-from ..util import find_file, cwd_from_file
+from ..daemon import SOCKET_FILE, Daemon, DaemonClient
+from ..exceptions import APIError, DaemonError, DownloadError, OfflineError
+from ..trace import Tracer
+from ..util import ChallengeDirs, atomic_write, find_file, cwd_from_file
 
-@click.group()
+CONFIG_FILE = ".rctf.json"
+CACHE_FILE = ".rctf-cache.json"
+RESPONSE_CACHE_DIR = ".rctf-cache"
+
+# The client (requests) and GUI (urwid, pyperclip) stacks are imported
+# where they are first needed so that `rctf --help` and `rctf submit` start
+# quickly; benchmarks/imports.py checks this.
+
+def make_client(url, token, ctf_root, hooks):
+  from ..cache import ResponseCache
+  from ..client import RCTFClient
+  return RCTFClient(url, token,
+    config_cache=ctf_root / CACHE_FILE,
+    cache=ResponseCache(path=ctf_root / RESPONSE_CACHE_DIR),
+    hooks=hooks,
+  )
+
+def connect(config, ctf_root, hooks):
+  fallback = lambda: make_client(config["url"], config["token"], ctf_root, hooks)
+  if (ctf_root / SOCKET_FILE).exists():
+    return DaemonClient(ctf_root / SOCKET_FILE, fallback, hooks)
+  return fallback()
+
+class RCTFGroup(click.Group):
+  def invoke(self, ctx):
+    try:
+      return super().invoke(ctx)
+    except (APIError, DaemonError, DownloadError, OfflineError) as e:
+      raise click.ClickException(str(e))
+
+@click.group(cls=RCTFGroup)
 @click.pass_context
-def rctf(ctx):
+@click.option("--trace", is_flag=True, default=False, help="print a per-endpoint latency summary on exit")
+@click.option("--metrics", metavar="<file>", type=click.Path(dir_okay=False, writable=True), default=None, help="write request metrics to a file (JSON if it ends in .json, otherwise Prometheus text)")
+@click.option("--store/--no-store", default=None, help="keep a local SQLite copy of challenges, solves and scoreboards (remembered for this CTF)")
+@click.option("--offline", is_flag=True, default=False, help="serve everything from the local store without contacting the platform")
+def rctf(ctx, trace, metrics, store, offline):
   """CLI and TUI client for rCTF"""
+  tracer = Tracer() if trace or metrics else None
+  if tracer:
+    @ctx.call_on_close
+    def report():
+      if trace:
+        click.echo(tracer.summary(), err=True)
+      if metrics:
+        tracer.dump(metrics)
+  hooks = [tracer] if tracer else []
   try:
-    config_path = find_file(".rctf.json")
+    config_path = find_file(CONFIG_FILE)
     ctf_root = config_path.parent
     with open(config_path) as f:
-      config = json.load(f)
-    client = RCTFClient(config["url"], config["token"])
+      text = f.read()
+    config, saved = json.loads(text), json.loads(text)
+    client = connect(config, ctf_root, hooks)
   except (FileNotFoundError, KeyError):
     try:
       url = click.prompt("rCTF URL")
       token = click.prompt("Login Token")
-      client = RCTFClient(url)
+      ctf_root = pathlib.Path.cwd().resolve()
+      client = make_client(url, None, ctf_root, hooks)
       client.login(token)
       config = {
         "url": client.url,
         "token": client.token,
       }
-      ctf_root = pathlib.Path.cwd().resolve()
+      saved = {}
     except Exception as e:                              # TODO: do this better
       click.echo(e, err=True)
       return
   except Exception as e:
     click.echo(e, err=True)
     return
+  if store is not None:
+    config["store"] = store
+  local_store = None
+  if offline or config.get("store", False):
+    from ..store import STORE_FILE, Store, StoreClient
+    local_store = Store(ctf_root / STORE_FILE)
+    client = StoreClient(client, local_store, offline=offline)
   ctx.obj = {
     "client": client,
     "config": config,
     "ctf_root": ctf_root,
+    "store": local_store,
+    "saved_config": saved,
   }
 
 @rctf.resultcallback()
 @click.pass_context
 def save_config(ctx, result, **kwargs):
-  with open(ctx.obj["ctf_root"] / ".rctf.json", "w") as f:
-    json.dump(ctx.obj["config"], f, indent=2)
+  config, saved = ctx.obj["config"], ctx.obj["saved_config"]
+  changed = {k: v for k, v in config.items() if saved.get(k) != v}
+  removed = [k for k in saved if k not in config]
+  if not changed and not removed:
+    return
+  # apply only what this command changed on top of the file as it is now, so
+  # concurrent rctf invocations don't drop each other's updates
+  path = ctx.obj["ctf_root"] / CONFIG_FILE
+  try:
+    with open(path) as f:
+      current = json.load(f)
+  except (OSError, ValueError):
+    current = {}
+  if "challenge_dirs" in changed:
+    changed["challenge_dirs"] = {**current.get("challenge_dirs", {}), **changed["challenge_dirs"]}
+  current.update(changed)
+  for k in removed:
+    current.pop(k, None)
+  atomic_write(path, json.dumps(current, indent=2))
 
 @rctf.command()
 def init():
@@ -57,6 +129,7 @@ def init():
 @click.pass_context
 def gui(ctx):
   """Start Terminal UI"""
+  from ..gui import GUI
   client, config, ctf_root = ctx.obj["client"], ctx.obj["config"], ctx.obj["ctf_root"]
   try:
     GUI(client, config, ctf_root).main()
@@ -65,7 +138,27 @@ def gui(ctx):
     click.echo(traceback.format_exc(), err=True)
     return
 
-from .challenges import list_challenges, show, download, submit
+@rctf.command()
+@click.pass_context
+@click.option("-i", "--interval", type=click.IntRange(1), default=30, show_default=True, help="seconds between background refreshes")
+def daemon(ctx, interval):
+  """Keep a warm client running for this CTF
+
+  Other rctf commands run in this CTF directory talk to the daemon over a
+  Unix socket while it is running.
+  """
+  config, ctf_root = ctx.obj["config"], ctx.obj["ctf_root"]
+  client = make_client(config["url"], config["token"], ctf_root, [])
+  signal.signal(signal.SIGTERM, signal.default_int_handler)
+  click.echo(f"Listening on {ctf_root / SOCKET_FILE}", err=True)
+  try:
+    Daemon(client, ctf_root / SOCKET_FILE, interval=interval).serve()
+  except KeyboardInterrupt:
+    pass
+  except Exception as e:
+    click.echo(e, err=True)
+
+from .challenges import list_challenges, show, download, submit, submit_batch, watch
 
 @rctf.group()
 def challenges():
@@ -76,16 +169,27 @@ challenges.add_command(list_challenges)
 challenges.add_command(show)
 challenges.add_command(download)
 challenges.add_command(submit)
+challenges.add_command(submit_batch)
+challenges.add_command(watch)
+
+from .scoreboard import graph
+
+@rctf.group()
+def scoreboard():
+  """View the scoreboard"""
+  pass
+
+scoreboard.add_command(graph)
 
 @rctf.command("submit")
 @click.pass_context
 @click.argument("flag")
 def challenge_submit(ctx, flag):
-  """Submit a challenge from its directory"""
+  """Submit a challenge from its directory or any directory inside it"""
   config = ctx.obj["config"]
-  relative_path = str(cwd_from_file(ctx.obj["ctf_root"]))
-  if "challenge_dirs" in config and relative_path in config["challenge_dirs"]:
-    ctx.invoke(submit, challenge=config["challenge_dirs"][relative_path], flag=flag)
+  challenge = ChallengeDirs(config).resolve(cwd_from_file(ctx.obj["ctf_root"]))
+  if challenge is not None:
+    ctx.invoke(submit, challenge=challenge, flag=flag)
   else:
     click.echo("Could not find challenge!", err=True)
     return
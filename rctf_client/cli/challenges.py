@@ -1,12 +1,19 @@
 import click
 import json
-import yaml
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from ..util import download_challenge
+from ..exceptions import APIError
+from ..util import format_size, parse_size
+
+def yaml_dump(data):
+  import yaml
+  return yaml.dump(data)
 
 output_functions = {
   "json": json.dumps,
-  "yaml": yaml.dump,
+  "yaml": yaml_dump,
 }
 
 def pretty(challenge):
@@ -30,12 +37,15 @@ Author: {challenge['author']}
 def list_challenges(ctx, solved, include, format):
   """List challenges"""
   client = ctx.obj["client"]
-  challenges = sorted(client.get_challenges(), key=lambda x: -x.get("sortWeight", 0))
-  if len(include) > 0:
-    challenges = [challenge for challenge in challenges if challenge["category"] in include]
-  if not solved:
-    solves = set(solve["id"] for solve in client.private_profile()["solves"])
-    challenges = [challenge for challenge in challenges if challenge["id"] not in solves]
+  if ctx.obj["store"]:
+    challenges = client.query_challenges(categories=include, solved=None if solved else False)
+  else:
+    challenges = sorted(client.get_challenges(), key=lambda x: -x.get("sortWeight", 0))
+    if len(include) > 0:
+      challenges = [challenge for challenge in challenges if challenge["category"] in include]
+    if not solved:
+      solves = set(solve["id"] for solve in client.private_profile()["solves"])
+      challenges = [challenge for challenge in challenges if challenge["id"] not in solves]
 
   if len(challenges) == 0:
     click.echo("No challenges!", err=True)
@@ -53,33 +63,63 @@ def list_challenges(ctx, solved, include, format):
 def show(ctx, id, format):
   """Show challenge by ID"""
   client = ctx.obj["client"]
-  challenges = client.get_challenges()
-  challenge = next(filter(lambda challenge: challenge["id"] == id, challenges), None)
+  challenge = client.get_challenge(id)
   if challenge:
     if format == "pretty":
       click.echo_via_pager(pretty(challenge))
     else:
-      click.echo_(output_functions[format](challenge))
+      click.echo(output_functions[format](challenge))
   else:
     click.echo("Could not find challenge!", err=True)
 
 @click.command()
 @click.pass_context
 @click.option("-i", "--include", metavar="<challenge>", default=[], show_default="include all challenges", help="challenges (by ID) to include, can specify multiple times", multiple=True)
-def download(ctx, include):
+@click.option("-j", "--jobs", type=click.IntRange(1), default=4, show_default=True, help="number of parallel downloads")
+@click.option("-r", "--rate-limit", metavar="<rate>", default=None, help="total download rate limit in bytes per second, e.g. 500K or 10M")
+@click.option("-s", "--segments", type=click.IntRange(1), default=4, show_default=True, help="connections per large file, for servers that support range requests")
+@click.option("--dedupe/--no-dedupe", default=None, help="share identical files between challenges and CTFs through a hardlinked store in ~/.cache/rctf/blobs, linked files are read-only (remembered for this CTF)")
+def download(ctx, include, jobs, rate_limit, segments, dedupe):
   """Download challenge files and information"""
+  from ..blobs import BlobStore
+  from ..download import Downloader, get_manifest
   client = ctx.obj["client"]
   config = ctx.obj["config"]
   ctf_root = ctx.obj["ctf_root"]
-  challenges = client.get_challenges()
+  try:
+    rate_limit = parse_size(rate_limit) if rate_limit else None
+  except ValueError as e:
+    raise click.BadParameter(str(e), param_hint="--rate-limit")
   if len(include) > 0:
-    challenges = [challenge for challenge in challenges if challenge["id"] in include]
+    challenges = [client.get_challenge(id) for id in include]
+    challenges = [challenge for challenge in challenges if challenge is not None]
+  else:
+    challenges = client.get_challenges()
   if len(challenges) == 0:
     click.echo("Could not find challenge!", err=True)
     return
-  with click.progressbar(challenges, label="Saving challenges") as bar:
-    for challenge in bar:
-      download_challenge(ctf_root, config, challenge)
+  if dedupe is not None:
+    config["dedupe"] = dedupe
+  blobs = BlobStore() if config.get("dedupe", False) else None
+  with click.progressbar(length=0, label=f"Saving {len(challenges)} challenges", item_show_func=lambda item: item) as bar:
+    current = {"file": ""}
+    def on_progress(done, total):
+      bar.length = max(total, 1)
+      bar.current_item = f"{format_size(bar.pos + done)} / {format_size(total)}{current['file']}"
+      bar.update(done)
+    def on_file_progress(path, done, size):
+      current["file"] = f"  {path.name} {done * 100 // max(size, 1)}%"
+    manifest = get_manifest(ctf_root)
+    downloader = Downloader(client.session,
+      jobs=jobs,
+      rate_limit=rate_limit,
+      on_progress=on_progress,
+      on_file_progress=on_file_progress,
+      manifest=manifest,
+      segments=segments,
+      blobs=blobs,
+    )
+    downloader.download(ctf_root, config, challenges)
 
 @click.command()
 @click.pass_context
@@ -96,4 +136,114 @@ def submit(ctx, challenge, flag):
     click.echo("Flag submitted!")
   except Exception as e:
     click.echo(e, err=True)
-    return
\ No newline at end of file
+    return
+
+@click.command("submit-batch")
+@click.pass_context
+@click.argument("input", type=click.File("r"), default="-")
+@click.option("-j", "--jobs", type=click.IntRange(1), default=4, show_default=True, help="number of parallel submissions")
+def submit_batch(ctx, input, jobs):
+  """Submit many flags at once
+
+  INPUT is a file with one CHALLENGE,FLAG pair per line (default: stdin).
+  Results are written as one JSON object per line.
+  """
+  client = ctx.obj["client"]
+  solved = set()
+  lock = threading.Lock()
+
+  def attempt(challenge, flag):
+    result = {"challenge": challenge, "flag": flag}
+    delay = 1
+    while True:
+      with lock:
+        if challenge in solved:
+          return {**result, "status": "skipped"}
+      try:
+        client.submit_flag(challenge, flag)
+        with lock:
+          solved.add(challenge)
+        return {**result, "status": "accepted"}
+      except APIError as e:
+        if e.kind == "badRateLimit" and delay <= 16:
+          time.sleep(delay)
+          delay *= 2
+          continue
+        if e.kind == "badAlreadySolvedChallenge":
+          with lock:
+            solved.add(challenge)
+        return {**result, "status": "rejected", "kind": e.kind, "message": e.message}
+      except Exception as e:
+        return {**result, "status": "error", "message": str(e)}
+
+  output = threading.Lock()
+  # keep at most a couple of submissions per job queued
+  slots = threading.BoundedSemaphore(2 * jobs)
+
+  def echo(result):
+    with output:
+      click.echo(json.dumps(result))
+
+  def report(future):
+    # print as soon as a submission finishes, even while input is blocked
+    echo(future.result())
+    slots.release()
+
+  with ThreadPoolExecutor(jobs) as pool:
+    for line in input:
+      line = line.strip()
+      if not line:
+        continue
+      challenge, sep, flag = line.partition(",")
+      if not sep:
+        echo({"line": line, "status": "error", "message": "expected CHALLENGE,FLAG"})
+        continue
+      slots.acquire()
+      pool.submit(attempt, challenge.strip(), flag.strip()).add_done_callback(report)
+
+def describe(event):
+  name = f"{event['category']}/{event['name']}" if event.get("name") else event.get("id")
+  if event["event"] == "release":
+    return f"New challenge: {name} ({event['points']} points)"
+  if event["event"] == "removed":
+    return f"Challenge removed: {name}"
+  if event["event"] == "points":
+    return f"{name}: {event['old']} -> {event['new']} points"
+  if event["event"] == "solves":
+    return f"{name}: {event['old']} -> {event['new']} solves"
+  if event["event"] == "team_solve":
+    return f"Your team solved {name}"
+  return f"Error: {event['message']}"
+
+@click.command("watch")
+@click.pass_context
+@click.option("--min-interval", type=click.FloatRange(1), default=10, show_default=True, help="shortest time between polls in seconds")
+@click.option("--max-interval", type=click.FloatRange(1), default=300, show_default=True, help="longest time between polls in seconds")
+@click.option("-f", "--format", type=click.Choice(["text", "ndjson"]), default="text", show_default=True, help="output format")
+def watch(ctx, min_interval, max_interval, format):
+  """Watch for new challenges, score changes and team solves
+
+  Polls less often while nothing changes and more often after a release.
+  """
+  from ..cache import DEFAULT_TTLS, ResponseCache
+  from ..client import RCTFClient
+  from ..store import StoreClient
+  from ..watch import watch as watch_challenges
+  client = ctx.obj["client"]
+  if isinstance(client, StoreClient) and client.offline:
+    raise click.ClickException("watch is not available offline")
+  # revalidate on every poll rather than serving cached responses; a daemon
+  # refreshes on its own schedule
+  direct = client.client if isinstance(client, StoreClient) else client
+  if isinstance(direct, RCTFClient):
+    direct.cache = ResponseCache(ttls={endpoint: 0 for endpoint in DEFAULT_TTLS})
+  try:
+    for events in watch_challenges(client, min_interval, max(min_interval, max_interval)):
+      now = time.time()
+      for event in events:
+        if format == "ndjson":
+          click.echo(json.dumps({"time": now, **event}))
+        else:
+          click.echo(f"[{time.strftime('%H:%M:%S', time.localtime(now))}] {describe(event)}")
+  except KeyboardInterrupt:
+    pass
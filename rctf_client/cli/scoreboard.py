@@ -0,0 +1,26 @@
+import click
+
+from .challenges import output_functions
+
+@click.command()
+@click.pass_context
+@click.option("-d", "--division", metavar="<division>", default=None, show_default="all divisions", help="division to show")
+@click.option("-n", "--limit", type=click.IntRange(1), default=10, show_default=True, help="number of top teams to show")
+@click.option("-H", "--height", type=click.IntRange(5), default=20, show_default=True, help="height of the graph in lines")
+@click.option("-f", "--format", type=click.Choice(["pretty", "json", "yaml"]), default="pretty", show_default=True, help="output format")
+def graph(ctx, division, limit, height, format):
+  """Show score over time for the top teams"""
+  from ..graph import Graph
+  client = ctx.obj["client"]
+  data = client.get_graph(division=division, limit=limit)
+  if len(data["graph"]) == 0:
+    click.echo("No teams!", err=True)
+    return
+  if format != "pretty":
+    click.echo(output_functions[format](data["graph"]))
+    return
+  width, _ = click.get_terminal_size()
+  graph = Graph(data)
+  click.echo("\n".join(line.rstrip() for line in graph.render(width, height)))
+  click.echo()
+  click.echo("\n".join(graph.legend()))
@@ -1,9 +1,18 @@
-from requests import request
+import requests
+import time
 import urllib
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from .cache import FileCache, SingleFlight
 from .exceptions import APIError
+from .trace import RequestTrace
 
 API_VERSION = "v1"
+RETRY_STATUSES = (500, 502, 503, 504)
+# an unknown id only refetches the index once it is at least this old
+INDEX_MISS_AGE = 5
 
 def _handle_response(resp, valid, message=False):
   if resp["kind"] in valid:
@@ -12,18 +21,94 @@ def _handle_response(resp, valid, message=False):
     return resp["data"]
   raise APIError(resp["kind"], resp["message"])
 
+def _paginate(fetch, key, page_size):
+  # fetch the next page in the background while the caller consumes this one
+  with ThreadPoolExecutor(1) as pool:
+    offset = 0
+    future = pool.submit(fetch, page_size, offset)
+    while True:
+      data = future.result()
+      page = data[key]
+      offset += len(page)
+      done = len(page) < page_size or offset >= data.get("total", float("inf"))
+      if not done:
+        future = pool.submit(fetch, page_size, offset)
+      yield from page
+      if done:
+        return
+
+class ChallengeIndex:
+  def __init__(self, challenges):
+    self.time = time.time()
+    self.challenges = challenges
+    self.by_id = {}
+    self.by_category = {}
+    for challenge in challenges:
+      self.by_id[challenge["id"]] = challenge
+      self.by_category.setdefault(challenge["category"], []).append(challenge)
+
+  def age(self):
+    return time.time() - self.time
+
+def make_session(pool_size=10, retries=3, backoff_factor=0.5):
+  retry = Retry(
+    total=retries,
+    backoff_factor=backoff_factor,
+    status_forcelist=RETRY_STATUSES,
+    raise_on_status=False,
+  )
+  adapter = HTTPAdapter(
+    pool_connections=pool_size,
+    pool_maxsize=pool_size,
+    max_retries=retry,
+  )
+  session = requests.Session()
+  session.mount("http://", adapter)
+  session.mount("https://", adapter)
+  return session
+
 class RCTFClient:
-  def __init__(self, url, token=None):
+  def __init__(self, url, token=None, pool_size=10, retries=3, backoff_factor=0.5, config_cache=None, config_ttl=3600, cache=None, hooks=None, index_ttl=30, coalesce_window=0.5):
     if not urllib.parse.urlparse(url).scheme in ["http", "https"]:
       raise ValueError(f"Invalid URL: {url}")
     self.url = url
     self.token = token
-    self.config = self._config()
-    if self.token:
-      self.private_profile()
+    self.session = make_session(pool_size, retries, backoff_factor)
+    self.config_cache = FileCache(config_cache, config_ttl) if config_cache else None
+    self._client_config = None
+    self.cache = cache
+    self.hooks = list(hooks or [])
+    self.index_ttl = index_ttl
+    self._index = None
+    # identical GETs in flight together, or within coalesce_window seconds of
+    # each other, share one request
+    self.inflight = SingleFlight(coalesce_window)
+
+  @property
+  def config(self):
+    if self._client_config is None:
+      self._client_config = self._config()
+    return self._client_config
+
+  def _request(self, method, endpoint, *args, **data):
+    path = endpoint.format(*(urllib.parse.quote(arg) for arg in args))
+    start = time.perf_counter()
+    if method == "GET":
+      key = (path, tuple(sorted((k, v) for k, v in data.items() if v is not None)))
+      result, shared = self.inflight.do(key, lambda: self._send(method, endpoint, path, data))
+      status, size, body = (None, 0, result[2]) if shared else result
+    else:
+      status, size, body = self._send(method, endpoint, path, data)
+      self.inflight.forget()
+    if self.hooks:
+      kind = body.get("kind") if isinstance(body, dict) else None
+      trace = RequestTrace(method, endpoint, status, kind, size, time.perf_counter() - start)
+      for hook in self.hooks:
+        hook(trace)
+    return body
 
-  def _request(self, method, endpoint, **data):
-    url = urllib.parse.urljoin(self.url, f"/api/{API_VERSION}{endpoint}")
+  def _send(self, method, endpoint, path, data):
+    url = urllib.parse.urljoin(self.url, f"/api/{API_VERSION}{path}")
 
     if data:
       data = {k: v for k, v in data.items() if v is not None}
@@ -32,23 +117,63 @@ class RCTFClient:
     if self.token:
       headers["Authorization"] = f"Bearer {self.token}"
 
+    cache_key, entry = None, None
+    if method == "GET" and self.cache and self.cache.cacheable(endpoint):
+      cache_key = self.cache.key(url, data, self.token)
+      entry = self.cache.get(cache_key)
+      if entry:
+        if entry["etag"] or entry["last_modified"]:
+          if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+          if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        elif time.time() - entry["time"] < self.cache.ttl(endpoint):
+          return None, 0, entry["body"]
+
     if method == "GET" and data:
-      resp = request(
+      resp = self.session.request(
         method, url,
         headers=headers,
         params=data,
       )
     else:
-      resp = request(
+      resp = self.session.request(
         method, url,
         headers=headers,
         json=data,
       )
-    return resp.json()
+
+    if cache_key:
+      if resp.status_code == 304 and entry:
+        return resp.status_code, len(resp.content), entry["body"]
+      body = resp.json()
+      if resp.status_code == 200:
+        self.cache.set(cache_key, {
+          "time": time.time(),
+          "etag": resp.headers.get("ETag"),
+          "last_modified": resp.headers.get("Last-Modified"),
+          "body": body,
+        })
+      return resp.status_code, len(resp.content), body
+    if method != "GET" and self.cache and resp.ok:
+      # anything we have cached may be stale after a write; rejected ones,
+      # such as a wrong flag, change nothing
+      self.cache.clear()
+    return resp.status_code, len(resp.content), resp.json()
+
+  def close(self):
+    self.session.close()
 
   def _config(self):
+    if self.config_cache:
+      config = self.config_cache.get(self.url)
+      if config is not None:
+        return config
     response = self._request("GET", "/integrations/client/config")
-    return _handle_response(response, ["goodClientConfig"])
+    config = _handle_response(response, ["goodClientConfig"])
+    if self.config_cache:
+      self.config_cache.set(self.url, config)
+    return config
 
   def login(self, token):
     response = self._request("POST", "/auth/login",
@@ -58,20 +183,46 @@ class RCTFClient:
 
   def get_challenges(self):
     response = self._request("GET", "/challs")
-    return _handle_response(response, ["goodChallenges"])
+    challenges = _handle_response(response, ["goodChallenges"])
+    self._index = ChallengeIndex(challenges)
+    return challenges
+
+  def challenge_index(self, max_age=None):
+    if max_age is None:
+      max_age = self.index_ttl
+    if self._index is None or self._index.age() > max_age:
+      self.get_challenges()
+    return self._index
+
+  def get_challenge(self, chall):
+    index = self.challenge_index()
+    if chall not in index.by_id and index.age() > INDEX_MISS_AGE:
+      # it may have been released since the index was built
+      index = self.challenge_index(max_age=0)
+    return index.by_id.get(chall)
+
+  def get_challenges_by_category(self):
+    return self.challenge_index().by_category
 
   def get_solves(self, chall, limit=10, offset=0):
-    response = self._request("GET", f"/challs/{urllib.parse.quote(chall)}/solves",
+    response = self._request("GET", "/challs/{}/solves", chall,
       limit=limit,
       offset=offset,
     )
     return _handle_response(response, ["goodChallengeSolves"])
 
+  def iter_solves(self, chall, page_size=100):
+    fetch = lambda limit, offset: self.get_solves(chall, limit=limit, offset=offset)
+    return _paginate(fetch, "solves", page_size)
+
   def submit_flag(self, chall, flag):
-    response = self._request("POST", f"/challs/{urllib.parse.quote(chall)}/submit",
+    response = self._request("POST", "/challs/{}/submit", chall,
       flag=flag,
     )
-    return _handle_response(response, ["goodFlag"])
+    data = _handle_response(response, ["goodFlag"])
+    # solve counts have changed
+    self._index = None
+    return data
 
   def get_members(self):
     response = self._request("GET", "/users/me/members")
@@ -84,7 +235,7 @@ class RCTFClient:
     return _handle_response(response, ["goodMemberCreate"])
 
   def remove_member(self, member):
-    response = self._request("DELETE", f"/users/me/members/{member}")
+    response = self._request("DELETE", "/users/me/members/{}", member)
     return _handle_response(response, ["goodMemberDelete"])
 
   def private_profile(self):
@@ -92,7 +243,7 @@ class RCTFClient:
     return _handle_response(response, ["goodUserData"])
 
   def public_profile(self, uuid):
-    response = self._request("GET", f"/users/{urllib.parse.quote(uuid)}")
+    response = self._request("GET", "/users/{}", uuid)
     return _handle_response(response, ["goodUserData"])
 
   def update_account(self, name=None, division=None):
@@ -120,6 +271,10 @@ class RCTFClient:
     )
     return _handle_response(response, ["goodLeaderboard"])
 
+  def iter_scoreboard(self, division=None, page_size=100):
+    fetch = lambda limit, offset: self.get_scoreboard(division=division, limit=limit, offset=offset)
+    return _paginate(fetch, "leaderboard", page_size)
+
   def get_graph(self, division=None, limit=10):
     response = self._request("GET", "/leaderboard/graph",
       division=division,
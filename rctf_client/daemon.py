@@ -0,0 +1,224 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+from .exceptions import APIError, DaemonError
+from .trace import RequestTrace
+
+SOCKET_FILE = ".rctf.sock"
+
+READ_METHODS = {
+  "config",
+  "get_challenges",
+  "get_challenge",
+  "get_challenges_by_category",
+  "get_solves",
+  "get_members",
+  "private_profile",
+  "public_profile",
+  "get_scoreboard",
+  "get_graph",
+}
+WRITE_METHODS = {
+  "submit_flag",
+  "add_member",
+  "remove_member",
+  "update_account",
+  "update_email",
+  "delete_email",
+}
+
+# state the daemon keeps warm from the moment it starts
+PRELOAD = [
+  ("get_challenges", [], {}),
+  ("private_profile", [], {}),
+  ("get_scoreboard", [], {}),
+]
+
+def _send(sock, message):
+  sock.sendall(json.dumps(message).encode() + b"\n")
+
+def _receive(sock):
+  data = b""
+  while not data.endswith(b"\n"):
+    chunk = sock.recv(1 << 16)
+    if not chunk:
+      raise ConnectionError("Daemon closed the connection")
+    data += chunk
+  return data
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+  def handle(self):
+    for line in self.rfile:
+      request = json.loads(line)
+      try:
+        data = self.server.daemon.call(request["method"], request.get("args", []), request.get("kwargs", {}))
+        response = {"ok": True, "data": data}
+      except APIError as e:
+        response = {"ok": False, "kind": e.kind, "message": e.message}
+      except Exception as e:
+        response = {"ok": False, "kind": None, "message": str(e)}
+      _send(self.request, response)
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+  daemon_threads = True
+
+class Daemon:
+  def __init__(self, client, socket_path, interval=30, keep=600):
+    self.client = client
+    self.socket_path = socket_path
+    self.interval = interval
+    self.keep = keep
+    self.state = {}
+    self.lock = threading.Lock()
+    self.stopped = threading.Event()
+
+  def _key(self, method, args, kwargs):
+    return json.dumps([method, args, kwargs], sort_keys=True)
+
+  def _fetch(self, method, args, kwargs):
+    if method == "config":
+      return self.client.config
+    return getattr(self.client, method)(*args, **kwargs)
+
+  def call(self, method, args, kwargs):
+    if method in WRITE_METHODS:
+      data = self._fetch(method, args, kwargs)
+      with self.lock:
+        # everything we hold may have changed, refetch on next use
+        self.state.clear()
+      return data
+    if method not in READ_METHODS:
+      raise ValueError(f"Unsupported method: {method}")
+    key = self._key(method, args, kwargs)
+    now = time.time()
+    with self.lock:
+      entry = self.state.get(key)
+      if entry is not None:
+        entry["used"] = now
+        if now - entry["time"] < 2 * self.interval:
+          return entry["data"]
+    data = self._fetch(method, args, kwargs)
+    with self.lock:
+      self.state[key] = {"time": time.time(), "used": now, "data": data, "call": (method, args, kwargs)}
+    return data
+
+  def refresh(self):
+    now = time.time()
+    with self.lock:
+      for key, entry in list(self.state.items()):
+        if now - entry["used"] > self.keep:
+          del self.state[key]
+      calls = [entry["call"] for entry in self.state.values()]
+    for method, args, kwargs in calls:
+      try:
+        self.call_fresh(method, args, kwargs)
+      except Exception:
+        pass
+
+  def call_fresh(self, method, args, kwargs):
+    data = self._fetch(method, args, kwargs)
+    key = self._key(method, args, kwargs)
+    with self.lock:
+      used = self.state.get(key, {}).get("used", time.time())
+      self.state[key] = {"time": time.time(), "used": used, "data": data, "call": (method, args, kwargs)}
+
+  def _refresher(self):
+    for method, args, kwargs in PRELOAD:
+      try:
+        self.call_fresh(method, args, kwargs)
+      except Exception:
+        pass
+    while not self.stopped.wait(self.interval):
+      self.refresh()
+
+  def serve(self):
+    if os.path.exists(self.socket_path):
+      if is_running(self.socket_path):
+        raise RuntimeError(f"Daemon already running on {self.socket_path}")
+      os.unlink(self.socket_path)
+    old_umask = os.umask(0o077)
+    try:
+      server = DaemonServer(str(self.socket_path), DaemonHandler)
+    finally:
+      os.umask(old_umask)
+    server.daemon = self
+    threading.Thread(target=self._refresher, daemon=True).start()
+    try:
+      server.serve_forever()
+    finally:
+      self.stopped.set()
+      server.server_close()
+      os.unlink(self.socket_path)
+
+def is_running(socket_path):
+  try:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+      sock.connect(str(socket_path))
+    return True
+  except OSError:
+    return False
+
+class DaemonClient:
+  def __init__(self, socket_path, fallback, hooks=None):
+    self.socket_path = socket_path
+    self.fallback = fallback
+    self.hooks = list(hooks or [])
+    self._client = None
+    self._alive = True
+
+  @property
+  def client(self):
+    if self._client is None:
+      self._client = self.fallback()
+    return self._client
+
+  @property
+  def config(self):
+    return self._call("config")
+
+  def _call(self, method, *args, **kwargs):
+    if self._alive:
+      sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+      try:
+        sock.connect(str(self.socket_path))
+      except OSError:
+        # stale socket, stop trying and talk to the server directly
+        sock.close()
+        self._alive = False
+    if self._alive:
+      start = time.perf_counter()
+      try:
+        with sock:
+          _send(sock, {"method": method, "args": args, "kwargs": kwargs})
+          data = _receive(sock)
+      except OSError as e:
+        self._alive = False
+        # a write may already have reached the platform, don't repeat it
+        if method in WRITE_METHODS:
+          raise DaemonError(f"Lost connection to the daemon: {e}") from None
+        return self._direct(method, *args, **kwargs)
+      response = json.loads(data)
+      if self.hooks:
+        trace = RequestTrace("DAEMON", method, None, response.get("kind"), len(data), time.perf_counter() - start)
+        for hook in self.hooks:
+          hook(trace)
+      if response["ok"]:
+        return response["data"]
+      if response["kind"] is not None:
+        raise APIError(response["kind"], response["message"])
+      raise DaemonError(response["message"])
+    return self._direct(method, *args, **kwargs)
+
+  def _direct(self, method, *args, **kwargs):
+    if method == "config":
+      return self.client.config
+    return getattr(self.client, method)(*args, **kwargs)
+
+  def __getattr__(self, name):
+    if name in READ_METHODS or name in WRITE_METHODS:
+      return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+    return getattr(self.client, name)
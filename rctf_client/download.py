@@ -0,0 +1,316 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import urllib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from .blobs import BlobStore
+from .exceptions import DownloadError
+from .util import atomic_write, make_challengedir, safe_name, write_description
+
+MANIFEST_FILE = ".rctf-manifest.json"
+SHA256_SEGMENT = re.compile(r"/([0-9a-fA-F]{64})(?=/|$)")
+
+class Manifest:
+  def __init__(self, path):
+    self.path = path
+    self.root = path.parent
+    self.lock = threading.Lock()
+    self._reload()
+
+  def _reload(self):
+    try:
+      with open(self.path) as f:
+        data = json.load(f)
+    except (OSError, ValueError):
+      data = {}
+    self.files = data.get("files", {})
+    self.partials = data.get("partials", {})
+
+  def _key(self, path):
+    return str(path.relative_to(self.root))
+
+  def is_current(self, url, path):
+    entry = self.files.get(self._key(path))
+    if entry is None or entry["url"] != url:
+      return False
+    try:
+      return path.stat().st_size == entry["size"]
+    except OSError:
+      return False
+
+  def get_partial(self, url, path):
+    partial = self.partials.get(self._key(path))
+    if partial is None or partial["url"] != url:
+      return None
+    return partial
+
+  def set_partial(self, url, path, validator, **extra):
+    with self.lock:
+      self._reload()
+      self.partials[self._key(path)] = {"url": url, "validator": validator, **extra}
+      self._save()
+
+  def clear_partial(self, path):
+    with self.lock:
+      self._reload()
+      if self.partials.pop(self._key(path), None) is not None:
+        self._save()
+
+  def set_file(self, url, path, size, sha256):
+    key = self._key(path)
+    with self.lock:
+      self._reload()
+      self.partials.pop(key, None)
+      self.files[key] = {
+        "url": url,
+        "size": size,
+        "sha256": sha256,
+        "fetched_at": time.time(),
+      }
+      self._save()
+
+  def _save(self):
+    # callers reload first, so entries written by other processes since are kept
+    atomic_write(self.path, json.dumps({"files": self.files, "partials": self.partials}, indent=2))
+
+# one manifest per CTF root in this process, shared by concurrent downloads
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+def get_manifest(ctf_root):
+  path = ctf_root / MANIFEST_FILE
+  with _manifests_lock:
+    if path not in _manifests:
+      _manifests[path] = Manifest(path)
+    return _manifests[path]
+
+class RateLimiter:
+  def __init__(self, rate):
+    self.rate = rate
+    self.allowance = rate
+    self.last = time.monotonic()
+    self.lock = threading.Lock()
+
+  def acquire(self, amount):
+    with self.lock:
+      now = time.monotonic()
+      self.allowance = min(self.rate, self.allowance + (now - self.last) * self.rate)
+      self.last = now
+      self.allowance -= amount
+      wait = -self.allowance / self.rate if self.allowance < 0 else 0
+    if wait > 0:
+      time.sleep(wait)
+
+def expected_sha256(url):
+  # rCTF stores uploads under their SHA-256, e.g. /uploads/<sha256>/<name>
+  match = SHA256_SEGMENT.search(urllib.parse.urlparse(url).path)
+  return match.group(1).lower() if match else None
+
+def preallocate(path, size):
+  with open(path, "wb") as f:
+    try:
+      os.posix_fallocate(f.fileno(), 0, size)
+    except (AttributeError, OSError):
+      f.truncate(size)
+
+class Downloader:
+  def __init__(self, session=None, jobs=4, rate_limit=None, on_progress=None, manifest=None, chunk_size=1 << 16, segments=4, segment_size=8 << 20, on_file_progress=None, blobs=None):
+    self.session = requests if session is None else session
+    self.manifest = manifest
+    self.jobs = jobs
+    self.limiter = RateLimiter(rate_limit) if rate_limit else None
+    self.on_progress = on_progress
+    self.on_file_progress = on_file_progress
+    self.chunk_size = chunk_size
+    # files of at least two segments are fetched over this many connections
+    self.segments = segments
+    self.segment_size = segment_size
+    self.blobs = blobs
+    self.lock = threading.Lock()
+    self.done = 0
+    self.total = 0
+    self.files = {}
+
+  def _progress(self, done=0, total=0, path=None):
+    with self.lock:
+      self.done += done
+      self.total += total
+      if self.on_progress:
+        self.on_progress(done, self.total)
+      if path is not None:
+        progress = self.files.setdefault(path, [0, 0])
+        progress[0] += done
+        progress[1] += total
+        if self.on_file_progress:
+          self.on_file_progress(path, *progress)
+
+  def download(self, ctf_root, config, challenges):
+    # directories are created up front since make_challengedir updates config
+    roots = [(challenge, make_challengedir(ctf_root, config, challenge)) for challenge in challenges]
+    with ThreadPoolExecutor(self.jobs) as pool:
+      futures = []
+      for challenge, challenge_root in roots:
+        futures.append(pool.submit(write_description, challenge_root, challenge))
+        if challenge["files"]:
+          files_dir = challenge_root / "files"
+          files_dir.mkdir(parents=True, exist_ok=True)
+          for challenge_file in challenge["files"]:
+            url = urllib.parse.urljoin(config["url"], challenge_file["url"])
+            futures.append(pool.submit(self.fetch, url, files_dir / safe_name(challenge_file["name"])))
+      for future in futures:
+        future.result()
+
+  def _discard(self, url, path, part):
+    if part.exists():
+      part.unlink()
+    if self.manifest:
+      self.manifest.clear_partial(path)
+
+  def fetch(self, url, path, segmented=True):
+    try:
+      return self._fetch(url, path, segmented)
+    except requests.RequestException as e:
+      raise DownloadError(f"{path.name}: {e}") from None
+
+  def _fetch(self, url, path, segmented=True):
+    if self.manifest and self.manifest.is_current(url, path):
+      return
+    expected = expected_sha256(url)
+    if self.blobs and expected and self.blobs.has(expected):
+      self.blobs.link(expected, path)
+      size = path.stat().st_size
+      self._progress(done=size, total=size, path=path)
+      if self.manifest:
+        self.manifest.clear_partial(path)
+        self.manifest.set_file(url, path, size, expected)
+      return
+    part = path.with_name(path.name + ".part")
+    partial = self.manifest.get_partial(url, path) if self.manifest else None
+    if segmented and partial and partial.get("segments") is not None and part.is_file():
+      return self._fetch_segmented(url, path, part, partial["size"], partial["validator"], partial)
+    # ask for the bytes as stored, so lengths and ranges refer to the file itself
+    headers = {"Accept-Encoding": "identity"}
+    offset = 0
+    if partial and part.is_file():
+      offset = part.stat().st_size
+      headers["Range"] = f"bytes={offset}-"
+      if partial["validator"]:
+        headers["If-Range"] = partial["validator"]
+
+    with self.session.get(url, headers=headers, stream=True) as stream:
+      if stream.status_code == 416:
+        # our partial file is no good, start over
+        self._discard(url, path, part)
+        return self.fetch(url, path, segmented)
+      stream.raise_for_status()
+      if stream.status_code != 206:
+        offset = 0
+      validator = stream.headers.get("ETag") or stream.headers.get("Last-Modified")
+      length = stream.headers.get("Content-Length")
+      length = int(length) if length is not None else None
+      if (segmented and offset == 0 and self.segments > 1 and length is not None
+          and length >= 2 * self.segment_size and stream.headers.get("Accept-Ranges") == "bytes"):
+        stream.close()
+        return self._fetch_segmented(url, path, part, length, validator)
+      if self.manifest:
+        self.manifest.set_partial(url, path, validator)
+
+      sha256 = hashlib.sha256()
+      if offset:
+        with open(part, "rb") as f:
+          for chunk in iter(lambda: f.read(self.chunk_size), b""):
+            sha256.update(chunk)
+      self._progress(total=length or 0, path=path)
+      size = offset
+      with open(part, "ab" if offset else "wb") as fw:
+        for chunk in stream.iter_content(self.chunk_size):
+          if self.limiter:
+            self.limiter.acquire(len(chunk))
+          fw.write(chunk)
+          sha256.update(chunk)
+          size += len(chunk)
+          self._progress(done=len(chunk), path=path)
+
+    if length is not None and size != offset + length:
+      # keep what we have, the next run resumes from it
+      raise DownloadError(f"{path.name}: expected {offset + length} bytes, got {size}")
+    self._finish(url, path, part, size, sha256.hexdigest())
+
+  def _fetch_segmented(self, url, path, part, size, validator, partial=None):
+    if partial and part.stat().st_size == size:
+      segment_size, done = partial["segment_size"], set(partial["segments"])
+    else:
+      count = min(self.segments, -(-size // self.segment_size))
+      segment_size, done = -(-size // count), set()
+      preallocate(part, size)
+    ranges = [(start, min(start + segment_size, size) - 1) for start in range(0, size, segment_size)]
+    todo = [(i, start, end) for i, (start, end) in enumerate(ranges) if i not in done]
+    if self.manifest:
+      self.manifest.set_partial(url, path, validator, size=size, segment_size=segment_size, segments=sorted(done))
+    self._progress(total=sum(end - start + 1 for _, start, end in todo), path=path)
+    try:
+      with ThreadPoolExecutor(max(len(todo), 1)) as pool:
+        futures = {pool.submit(self._fetch_segment, url, path, part, start, end, validator): i for i, start, end in todo}
+        for future in as_completed(futures):
+          future.result()
+          done.add(futures[future])
+          if self.manifest:
+            self.manifest.set_partial(url, path, validator, size=size, segment_size=segment_size, segments=sorted(done))
+    except _RangeIgnored:
+      # the file changed since the partial download, or the server stopped
+      # honouring ranges; start over with a single connection
+      self._discard(url, path, part)
+      return self.fetch(url, path, segmented=False)
+
+    sha256 = hashlib.sha256()
+    with open(part, "rb") as f:
+      for chunk in iter(lambda: f.read(1 << 20), b""):
+        sha256.update(chunk)
+    self._finish(url, path, part, size, sha256.hexdigest())
+
+  def _fetch_segment(self, url, path, part, start, end, validator):
+    headers = {"Accept-Encoding": "identity", "Range": f"bytes={start}-{end}"}
+    if validator:
+      headers["If-Range"] = validator
+    with self.session.get(url, headers=headers, stream=True) as stream:
+      stream.raise_for_status()
+      if stream.status_code != 206:
+        raise _RangeIgnored()
+      position = start
+      with open(part, "r+b") as f:
+        f.seek(start)
+        for chunk in stream.iter_content(self.chunk_size):
+          if position + len(chunk) > end + 1:
+            raise DownloadError(f"{path.name}: server sent more than bytes {start}-{end}")
+          if self.limiter:
+            self.limiter.acquire(len(chunk))
+          f.write(chunk)
+          position += len(chunk)
+          self._progress(done=len(chunk), path=path)
+    if position != end + 1:
+      raise DownloadError(f"{path.name}: expected bytes {start}-{end}, got {start}-{position - 1}")
+
+  def _finish(self, url, path, part, size, sha256):
+    expected = expected_sha256(url)
+    if expected is not None and sha256 != expected:
+      self._discard(url, path, part)
+      raise DownloadError(f"{path.name}: SHA-256 is {sha256}, expected {expected}")
+    os.replace(part, path)
+    if self.blobs:
+      self.blobs.add(path, sha256)
+    if self.manifest:
+      self.manifest.set_file(url, path, size, sha256)
+
+class _RangeIgnored(Exception):
+  pass
+
+def download_challenge(ctf_root, config, challenge, session=None):
+  manifest = get_manifest(ctf_root)
+  blobs = BlobStore() if config.get("dedupe", False) else None
+  Downloader(session, jobs=1, manifest=manifest, blobs=blobs).download(ctf_root, config, [challenge])
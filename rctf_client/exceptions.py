@@ -6,3 +6,12 @@ class APIError(Exception):
 
   def __str__(self):
     return f"{self.kind}: {self.message}"
+
+class OfflineError(Exception):
+  pass
+
+class DownloadError(Exception):
+  pass
+
+class DaemonError(Exception):
+  pass
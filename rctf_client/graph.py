@@ -0,0 +1,139 @@
+import array
+import bisect
+import time
+
+MARKERS = "1234567890ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# rendered sizes and downsampled widths kept around for redraws
+RENDER_CACHE_SIZE = 8
+# series are reduced to this many points once, narrower views downsample that
+MAX_POINTS = 1024
+
+# Largest-Triangle-Three-Buckets: pick the indices of the points that best
+# keep the visual shape of the series
+def lttb(xs, ys, threshold):
+  n = len(xs)
+  if threshold >= n:
+    return list(range(n))
+  if threshold < 3:
+    return [0, n - 1][:max(threshold, 0)]
+  every = (n - 2) / (threshold - 2)
+  indices = [0]
+  a = 0
+  for i in range(threshold - 2):
+    avg_start = int((i + 1) * every) + 1
+    avg_end = min(int((i + 2) * every) + 1, n)
+    avg_x = sum(xs[avg_start:avg_end]) / (avg_end - avg_start)
+    avg_y = sum(ys[avg_start:avg_end]) / (avg_end - avg_start)
+    ax, ay = xs[a], ys[a]
+    best, best_area = None, -1
+    for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+      area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+      if area > best_area:
+        best, best_area = j, area
+    indices.append(best)
+    a = best
+  indices.append(n - 1)
+  return indices
+
+class Series:
+  def __init__(self, times, scores):
+    self.times = times
+    self.scores = scores
+    self._downsampled = {}
+
+  @classmethod
+  def from_points(cls, points):
+    points = sorted(points, key=lambda point: point["time"])
+    return cls(
+      array.array("q", (point["time"] for point in points)),
+      array.array("q", (point["score"] for point in points)),
+    )
+
+  def __len__(self):
+    return len(self.times)
+
+  def downsample(self, threshold):
+    if threshold >= len(self):
+      return self
+    if threshold < MAX_POINTS < len(self):
+      return self.downsample(MAX_POINTS).downsample(threshold)
+    if threshold not in self._downsampled:
+      if len(self._downsampled) >= RENDER_CACHE_SIZE:
+        self._downsampled.clear()
+      indices = lttb(self.times, self.scores, threshold)
+      self._downsampled[threshold] = Series(
+        array.array("q", (self.times[i] for i in indices)),
+        array.array("q", (self.scores[i] for i in indices)),
+      )
+    return self._downsampled[threshold]
+
+  def at(self, t):
+    i = bisect.bisect_right(self.times, t)
+    return self.scores[i - 1] if i > 0 else 0
+
+def format_time(ms):
+  return time.strftime("%m-%d %H:%M", time.localtime(ms / 1000))
+
+class Graph:
+  def __init__(self, data):
+    self.teams = [
+      (team["id"], team["name"], Series.from_points(team["points"]))
+      for team in data["graph"]
+    ]
+    series = [series for _, _, series in self.teams if len(series) > 0]
+    self.start = min((s.times[0] for s in series), default=0)
+    self.end = max((s.times[-1] for s in series), default=0)
+    self.max_score = max((max(s.scores) for s in series), default=0)
+    self._rendered = {}
+
+  def legend(self):
+    return [f"{MARKERS[k % len(MARKERS)]} {name}" for k, (_, name, _) in enumerate(self.teams)]
+
+  def render(self, width, height):
+    if (width, height) not in self._rendered:
+      if len(self._rendered) >= RENDER_CACHE_SIZE:
+        self._rendered.clear()
+      self._rendered[width, height] = self._render(width, height)
+    return self._rendered[width, height]
+
+  def _render(self, width, height):
+    label_width = len(str(self.max_score))
+    plot_width = width - label_width - 1
+    plot_height = height - 2
+    if plot_width < 2 or plot_height < 2 or self.end <= self.start:
+      return [" " * width for _ in range(height)]
+    grid = [[" "] * plot_width for _ in range(plot_height)]
+    columns = [self.start + (self.end - self.start) * c // (plot_width - 1) for c in range(plot_width)]
+    scale = (plot_height - 1) / self.max_score if self.max_score > 0 else 0
+    # draw the leader last so it stays on top
+    for k in reversed(range(len(self.teams))):
+      series = self.teams[k][2].downsample(max(3, plot_width))
+      if len(series) == 0:
+        continue
+      marker = MARKERS[k % len(MARKERS)]
+      previous = None
+      for c, t in enumerate(columns):
+        if t < series.times[0]:
+          continue
+        row = round(series.at(t) * scale)
+        low, high = (row, row) if previous is None else (min(row, previous), max(row, previous))
+        for r in range(low, high + 1):
+          grid[plot_height - 1 - r][c] = marker
+        previous = row
+    lines = []
+    for r, cells in enumerate(grid):
+      label = ""
+      if r == 0:
+        label = str(self.max_score)
+      elif r == plot_height - 1:
+        label = "0"
+      elif r == (plot_height - 1) // 2:
+        label = str(self.max_score - self.max_score * r // (plot_height - 1))
+      lines.append(f"{label:>{label_width}}│{''.join(cells)}")
+    lines.append(" " * label_width + "└" + "─" * plot_width)
+    start, end = format_time(self.start), format_time(self.end)
+    padding = plot_width - len(start) - len(end)
+    axis = start + " " * padding + end if padding > 0 else start[:plot_width]
+    lines.append(" " * (label_width + 1) + axis)
+    return lines
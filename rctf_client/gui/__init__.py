@@ -5,6 +5,8 @@ from .header import HeaderWidget
 from .scoreboard import ScoreboardPage
 from .profile import ProfilePage
 from .challenges import ChallengesPage
+from .graph import GraphPage
+from .worker import Worker
 
 keymap = {
   "k": "cursor up",
@@ -28,26 +30,35 @@ class GUI:
     self.client = client
     self.config = config
     self.ctf_root = ctf_root
+    self.worker = Worker()
+    # pages are built, and start loading, the first time they are selected
     self.tabs = [
-      ("Scoreboard", ScoreboardPage(self.client, self.config)),
-      ("Profile", ProfilePage(self.client, self.config)),
-      ("Challenges", ChallengesPage(self.client, self.config, self.ctf_root)),
+      ("Scoreboard", lambda: ScoreboardPage(self.client, self.config, self.worker)),
+      ("Profile", lambda: ProfilePage(self.client, self.config, self.worker)),
+      ("Challenges", lambda: ChallengesPage(self.client, self.config, self.ctf_root, self.worker)),
+      ("History", lambda: GraphPage(self.client, self.config, self.worker)),
     ]
-    for tab in self.tabs:
-      urwid.connect_signal(tab[1], "dialog_open", self.dialog_open)
-      urwid.connect_signal(tab[1], "dialog_close", self.dialog_close)
+    self.pages = {}
     self.tab_keys = [str(x) for x in range(1, len(self.tabs)+1)]
     self.dialog_state = False
     self.header = urwid.AttrWrap(HeaderWidget(client, self.tabs), "header")
+    self.worker.run(lambda: self.client.config["ctfName"], on_done=self.header.set_title)
     self.view = urwid.Frame(
-      self.tabs[0][1],
+      urwid.SolidFill(),
       header=self.header,
     )
     self.select_tab(self.config.get("selected_tab", 0))
 
+  def page(self, tab):
+    if tab not in self.pages:
+      page = self.pages[tab] = self.tabs[tab][1]()
+      urwid.connect_signal(page, "dialog_open", self.dialog_open)
+      urwid.connect_signal(page, "dialog_close", self.dialog_close)
+    return self.pages[tab]
+
   def select_tab(self, tab):
     self.header.select_tab(tab)
-    self.view.body = self.tabs[tab][1]
+    self.view.body = self.page(tab)
     self.config["selected_tab"] = tab
 
   def unhandled_input(self, k):
@@ -77,9 +88,12 @@ class GUI:
       handle_mouse=False,
       unhandled_input=self.unhandled_input
     )
+    self.worker.attach(self.loop)
     try:
       self.loop.run()
     except KeyboardInterrupt:
       return
     except Exception as e:
-      raise e from None
\ No newline at end of file
+      raise e from None
+    finally:
+      self.worker.shutdown()
\ No newline at end of file
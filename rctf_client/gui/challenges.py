@@ -3,15 +3,20 @@ import os
 import urwid
 from urwid.command_map import (CURSOR_LEFT, CURSOR_RIGHT, ACTIVATE)
 
-from .components import Alert, Dialog, CheckBox, TextBox
+from .components import Alert, Dialog, CheckBox, Placeholder, TextBox
 
-from ..util import download_challenge, make_challengedir
+from ..download import download_challenge
+from ..exceptions import OfflineError
 
 class ChallengesPage(urwid.Columns):
-  def __init__(self, client, config, ctf_root):
+  def __init__(self, client, config, ctf_root, worker):
     self.client = client
     self.config = config
     self.ctf_root = ctf_root
+    self.worker = worker
+    self.categories = None
+    self.category = None
+    self.challenge = None
     if "challenges_showsolved" not in self.config:
       self.config["challenges_showsolved"] = False
     if "challenges_categories" not in self.config:
@@ -23,7 +28,7 @@ class ChallengesPage(urwid.Columns):
   def keypress(self, size, key):
     if super().keypress(size, key) is None:
       return
-    if key == "f":
+    if key == "f" and self.categories is not None:
       dialog = FilterDialog(
         {k: k for k in self.categories},
         self.config["challenges_categories"],
@@ -41,44 +46,68 @@ class ChallengesPage(urwid.Columns):
   def dialog_close(self, *args, **kwargs):
     urwid.emit_signal(self, "dialog_close")
 
-  def reload(self):
-    challenges = self.client.get_challenges()
-    self.categories = set(challenge["category"] for challenge in challenges)
-    self.solves = set(solve["id"] for solve in self.client.private_profile()["solves"])
-    self.challenge_tree = {}
-    for challenge in challenges:
-      if len(self.config["challenges_categories"]) > 0 and challenge["category"] not in self.config["challenges_categories"]:
-        continue
-      if not self.config["challenges_showsolved"] and challenge["id"] in self.solves:
-        continue
-      if challenge["category"] not in self.challenge_tree:
-        self.challenge_tree[challenge["category"]] = []
-      self.challenge_tree[challenge["category"]].append(challenge)
-    categories_column = (
-      Column({k: k for k in self.challenge_tree.keys()}, on_select=self.expand_category, title="Categories (F)", title_align="left"),
-      self.options()
+  def reload(self, expand=None):
+    if self.categories is None:
+      self.contents = [(Placeholder(title="Categories (F)", title_align="left"), self.options())]
+    self.worker.run(self._fetch,
+      on_done=lambda result: self._loaded(result, expand),
+      on_error=self._failed,
     )
-    self.contents = [categories_column]
+
+  def _fetch(self):
+    by_category = self.client.get_challenges_by_category()
+    solves = set(solve["id"] for solve in self.client.private_profile()["solves"])
+    return by_category, solves
+
+  def _failed(self, error):
+    if self.categories is None:
+      self.contents = [(Placeholder(str(error), title="Error", title_align="left"), self.options())]
+    else:
+      self.msg(msg=error, title="Error")
+
+  def _filter(self, by_category):
+    challenge_tree = {}
+    for category, challenges in by_category.items():
+      if len(self.config["challenges_categories"]) > 0 and category not in self.config["challenges_categories"]:
+        continue
+      if not self.config["challenges_showsolved"]:
+        challenges = [challenge for challenge in challenges if challenge["id"] not in self.solves]
+      if len(challenges) > 0:
+        challenge_tree[category] = challenges
+    return challenge_tree
+
+  def _loaded(self, result, expand=None):
+    by_category, self.solves = result
+    self.categories = set(by_category)
+    self.challenge_tree = self._filter(by_category)
+    self.categories_column = Column({k: k for k in self.challenge_tree.keys()}, on_select=self.expand_category, title="Categories (F)", title_align="left")
+    self.contents = [(self.categories_column, self.options())]
+    self.category = None
+    self.challenge = None
+    if expand in self.challenge_tree:
+      self.expand_category(expand)
+
+  def _label(self, challenge):
+    return challenge["name"]+(" (Solved)" if challenge["id"] in self.solves else "")
 
   def expand_category(self, category):
     self.category = category
-    challenge_names = {k: (challenge["name"]+(" (Solved)" if challenge["id"] in self.solves else "")) for k, challenge in enumerate(self.challenge_tree[category])}
-    challenges_column = (
-      Column(challenge_names, on_select=self.expand_challenge, on_leave=self.close_category, title="Challenges", title_align="left"),
-      self.options()
-    )
-    self.contents = self.contents[:1] + [challenges_column]
+    self.challenge = None
+    challenge_names = {challenge["id"]: self._label(challenge) for challenge in self.challenge_tree[category]}
+    self.challenges_column = Column(challenge_names, on_select=self.expand_challenge, on_leave=self.close_category, title="Challenges", title_align="left")
+    self.contents = self.contents[:1] + [(self.challenges_column, self.options())]
     self.set_focus(1)
 
   def close_category(self):
     self.category = None
+    self.challenge = None
     self.contents = self.contents[:1]
     self.set_focus(0)
 
-  def expand_challenge(self, challenge):
-    challenge = self.challenge_tree[self.category][challenge]
+  def expand_challenge(self, id):
+    challenge = next(challenge for challenge in self.challenge_tree[self.category] if challenge["id"] == id)
     self.challenge = challenge["id"]
-    challenge_box = (Challenge(self.ctf_root, self.config, challenge, on_leave=self.close_challenge, on_submit=self.submit_flag, on_msg=self.msg), self.options(width_amount=4))
+    challenge_box = (Challenge(self.ctf_root, self.config, challenge, self.worker, client=self.client, on_leave=self.close_challenge, on_submit=self.submit_flag, on_msg=self.msg), self.options(width_amount=4))
     self.contents = self.contents[:2] + [challenge_box]
     self.set_focus(2)
 
@@ -88,13 +117,57 @@ class ChallengesPage(urwid.Columns):
     self.set_focus(1)
 
   def submit_flag(self, flag):
-    try:
-      self.client.submit_flag(self.challenge, flag.get_value())
-      self.msg(msg="Flag submitted!")
-      self.reload()
-      self.expand_category(self.category)
-    except Exception as e:
-      self.msg(msg=e, title="Error")
+    id, category = self.challenge, self.category
+    self.worker.run(self.client.submit_flag, id, flag.get_value(),
+      on_done=lambda result: self._submitted(id, category),
+      on_error=lambda e: self.msg(msg=e, title="Error"),
+    )
+
+  def _submitted(self, id, category):
+    self.msg(msg="Flag submitted!")
+    self.solves.add(id)
+    expanded = self.category == category
+    # a reload or filter change may have landed first and already dropped
+    # it, in which case the revalidation below catches up
+    listed = any(challenge["id"] == id for challenge in self.challenge_tree.get(category, []))
+    if listed and not self.config["challenges_showsolved"]:
+      self.challenge_tree[category] = [challenge for challenge in self.challenge_tree[category] if challenge["id"] != id]
+      if expanded:
+        if self.challenge == id:
+          self.close_challenge()
+        self.challenges_column.remove(id)
+      if len(self.challenge_tree[category]) == 0:
+        del self.challenge_tree[category]
+        if expanded:
+          self.close_category()
+        self.categories_column.remove(category)
+    elif listed and expanded:
+      challenge = next(challenge for challenge in self.challenge_tree[category] if challenge["id"] == id)
+      self.challenges_column.set_text(id, self._label(challenge))
+    # solve counts and points have changed on the server
+    self.worker.run(self._fetch, on_done=self._revalidated)
+
+  def _revalidated(self, result):
+    by_category, self.solves = result
+    self.categories = set(by_category)
+    challenge_tree = self._filter(by_category)
+    shape = lambda tree: {category: [challenge["id"] for challenge in challenges] for category, challenges in tree.items()}
+    if shape(challenge_tree) != shape(self.challenge_tree):
+      category, id = self.category, self.challenge
+      self._loaded(result, expand=category)
+      if self.category is not None and id is not None:
+        self.challenges_column.focus_key(id)
+        # keep the open challenge open if it is still listed
+        if any(challenge["id"] == id for challenge in self.challenge_tree[self.category]):
+          self.expand_challenge(id)
+      return
+    self.challenge_tree = challenge_tree
+    if self.category is not None:
+      for challenge in self.challenge_tree[self.category]:
+        self.challenges_column.set_text(challenge["id"], self._label(challenge))
+    if self.challenge is not None:
+      challenge = next(challenge for challenge in self.challenge_tree[self.category] if challenge["id"] == self.challenge)
+      self.contents[2][0].update(challenge)
 
   def save_filter(self, button, user_data):
     self.dialog_close()
@@ -129,9 +202,22 @@ class Column(urwid.LineBox):
   def __init__(self, items, *args, on_select=None, on_leave=None, **kwargs):
     self.on_select = on_select
     self.on_leave = on_leave
-    super().__init__(urwid.ListBox([
-      ColumnRow(key, text, self._on_select) for key, text in items.items()
-      ]), *args, **kwargs)
+    self.keyed_rows = {key: ColumnRow(key, text, self._on_select) for key, text in items.items()}
+    self.list = urwid.ListBox(urwid.SimpleFocusListWalker(list(self.keyed_rows.values())))
+    super().__init__(self.list, *args, **kwargs)
+
+  def set_text(self, key, text):
+    if key in self.keyed_rows:
+      self.keyed_rows[key].set_text(text)
+
+  def remove(self, key):
+    row = self.keyed_rows.pop(key, None)
+    if row is not None:
+      self.list.body.remove(row)
+
+  def focus_key(self, key):
+    if key in self.keyed_rows:
+      self.list.set_focus(self.list.body.index(self.keyed_rows[key]))
 
   def _on_select(self, row):
     if self.on_select:
@@ -148,7 +234,12 @@ class ColumnRow(urwid.WidgetWrap):
     self.key = key
     self.text = text
     self.on_select = on_select
-    super().__init__(urwid.AttrMap(urwid.Text(text, wrap="clip"), "body", "highlight"))
+    self._text = urwid.Text(text, wrap="clip")
+    super().__init__(urwid.AttrMap(self._text, "body", "highlight"))
+
+  def set_text(self, text):
+    self.text = text
+    self._text.set_text(text)
 
   def selectable(self):
     return True
@@ -159,18 +250,22 @@ class ColumnRow(urwid.WidgetWrap):
     return key
 
 class Challenge(urwid.LineBox):
-  def __init__(self, ctf_root, config, challenge, on_leave=None, on_submit=None, on_msg=None):
+  def __init__(self, ctf_root, config, challenge, worker, client=None, on_leave=None, on_submit=None, on_msg=None):
     self.ctf_root = ctf_root
     self.config = config
     self.challenge = challenge
+    self.worker = worker
+    self.downloading = False
+    self.client = client
     self.on_leave = on_leave
     self.on_msg = on_msg
-    title = f"{challenge['category']}/{challenge['name']} ({challenge['solves']} solve{'s' if challenge['solves'] != 1 else ''} / {challenge['points']} point{'s' if challenge['points'] != 1 else ''})"
+    title = self.make_title(challenge)
     files = [f"  - {f['name']} ({f['url']})" for f in challenge["files"]]
     if len(files) == 0:
       files = ["(none)"]
     files = [urwid.Text(text) for text in files]
     self.submit = TextBox(label="Submit (S)")
+    self.download_button = urwid.Button("Download (D)", on_press=self.download)
     urwid.connect_signal(self.submit, "activate", on_submit, user_args=[self.submit])
     self.list = urwid.ListBox([
       urwid.Text(f"Author: {challenge['author']}"),
@@ -180,23 +275,44 @@ class Challenge(urwid.LineBox):
       urwid.Text("Files:"),
       *files,
       urwid.Divider("─"),
-      urwid.Button("Download (D)", on_press=self.download),
+      self.download_button,
       urwid.Divider(" "),
       self.submit,
     ])
     super().__init__(self.list, title=title, title_align="left")
 
+  def make_title(self, challenge):
+    return f"{challenge['category']}/{challenge['name']} ({challenge['solves']} solve{'s' if challenge['solves'] != 1 else ''} / {challenge['points']} point{'s' if challenge['points'] != 1 else ''})"
+
+  def update(self, challenge):
+    self.challenge = challenge
+    self.set_title(self.make_title(challenge))
+
   def selectable(self):
     return True
 
   def download(self, *args, **kwargs):
+    if self.downloading:
+      return
     try:
-      download_challenge(self.ctf_root, self.config, self.challenge)
+      # an offline client has no session, so only ask for one when downloading
+      session = self.client.session if self.client else None
+    except OfflineError:
       if self.on_msg:
-        self.on_msg(msg="Successfully Downloaded")
-    except Exception as e:
-      if self.on_msg:
-        self.on_msg(msg=e, title="Error")
+        self.on_msg(msg="Downloads are not available offline", title="Error")
+      return
+    self.downloading = True
+    self.download_button.set_label("Downloading...")
+    self.worker.run(download_challenge, self.ctf_root, self.config, self.challenge, session=session,
+      on_done=lambda result: self._downloaded("Successfully Downloaded"),
+      on_error=lambda e: self._downloaded(e, title="Error"),
+    )
+
+  def _downloaded(self, msg, title=""):
+    self.downloading = False
+    self.download_button.set_label("Download (D)")
+    if self.on_msg:
+      self.on_msg(msg=msg, title=title)
 
   def keypress(self, size, key):
     if super().keypress(size, key) is None:
@@ -13,6 +13,10 @@ class Alert(Dialog):
       urwid.Button("Ok", on_press=on_ok, user_data=self),
     ]), *args, **kwargs)
 
+class Placeholder(urwid.LineBox):
+  def __init__(self, text="Loading...", *args, **kwargs):
+    super().__init__(urwid.Filler(urwid.Text(text, align="center")), *args, **kwargs)
+
 class TextBox(urwid.LineBox):
   def __init__(self, value="", label=""):
     self.value = value
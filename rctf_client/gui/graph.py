@@ -0,0 +1,86 @@
+import urwid
+
+from .components import Placeholder
+from .scoreboard import FilterDialog
+from ..graph import MAX_POINTS, Graph
+
+class GraphPage(urwid.WidgetWrap):
+  def __init__(self, client, config, worker):
+    self.client = client
+    self.config = config
+    self.worker = worker
+    self.division = self.config.get("graph_division", None)
+    self.limit = self.config.get("graph_limit", 10)
+    super().__init__(Placeholder())
+    self.reload()
+    urwid.register_signal(GraphPage, ["dialog_open", "dialog_close"])
+
+  def selectable(self):
+    return True
+
+  def keypress(self, size, key):
+    if key == "f":
+      dialog = FilterDialog(self.client.config["divisions"],
+        selected=self.division,
+        on_save=self.save_division,
+        on_cancel=self.dialog_close,
+      )
+      urwid.emit_signal(self, "dialog_open", dialog)
+      return
+    return key
+
+  def save_division(self, button, user_data):
+    self.dialog_close()
+    division = user_data.division.get_value()
+    if division == "":
+      division = None
+    self.config["graph_division"] = division
+    self.division = division
+    self.reload()
+
+  def dialog_close(self, *args, **kwargs):
+    urwid.emit_signal(self, "dialog_close")
+
+  def reload(self):
+    division = self.division
+    self.worker.run(self._fetch, division,
+      on_done=lambda graph: self._loaded(division, graph),
+      on_error=lambda e: self._failed(division, e),
+    )
+
+  def _fetch(self, division):
+    self.client.config
+    graph = Graph(self.client.get_graph(division=division, limit=self.limit))
+    # do the expensive first downsampling pass here instead of on first draw
+    for _, _, series in graph.teams:
+      series.downsample(MAX_POINTS)
+    return graph
+
+  def _failed(self, division, error):
+    if division == self.division:
+      self._w = Placeholder(str(error), title="Error", title_align="left")
+
+  def _loaded(self, division, graph):
+    if division != self.division:
+      return
+    if len(graph.teams) == 0:
+      content = urwid.Filler(urwid.Text("No teams"), valign="top")
+    else:
+      legend = urwid.GridFlow([urwid.Text(entry, wrap="clip") for entry in graph.legend()],
+        cell_width=max(len(entry) for entry in graph.legend()), h_sep=2, v_sep=0, align="left")
+      content = urwid.Pile([GraphWidget(graph), ("pack", urwid.Divider("─")), ("pack", legend)])
+    title = "All Divisions" if self.division is None else f"{self.client.config['divisions'][self.division]} Division"
+    title += " (F)"
+    self._w = urwid.LineBox(content, title=title, title_align="left")
+
+class GraphWidget(urwid.Widget):
+  _sizing = frozenset(["box"])
+
+  def __init__(self, graph):
+    self.graph = graph
+    super().__init__()
+
+  def render(self, size, focus=False):
+    width, height = size
+    lines = self.graph.render(width, height)
+    return urwid.TextCanvas([line.encode("utf-8") for line in lines], maxcol=width)
@@ -5,11 +5,12 @@ class HeaderWidget(urwid.Padding):
     self.client = client
     self.tabs = tabs
     self.selected_tab = 1
+    self.title = ""
     self.text = urwid.Text(self.make_text())
     urwid.Padding.__init__(self, self.text, left=2, right=2)
 
   def make_text(self):
-    text = [self.client.config["ctfName"]]
+    text = [self.title]
     for k, tab in enumerate(self.tabs):
       text += [" "*2]
       label = f"{tab[0]} ({k+1})"
@@ -20,6 +21,10 @@ class HeaderWidget(urwid.Padding):
 
     return text
 
+  def set_title(self, title):
+    self.title = title
+    self.text.set_text(self.make_text())
+
   def select_tab(self, tab):
     if tab < 0 or tab >= len(self.tabs):
       raise IndexError("Tab index out of range")
@@ -2,14 +2,15 @@ import urwid
 from datetime import datetime
 import pyperclip
 
-from .components import Alert, Dialog, TextBox, RadioBox
+from .components import Alert, Dialog, Placeholder, TextBox, RadioBox
 from ..util import ordinal_suffix
 
 class ProfilePage(urwid.Columns):
-  def __init__(self, client, config):
+  def __init__(self, client, config, worker):
     self.client = client
     self.config = config
-    self.profile = self.client.private_profile()
+    self.worker = worker
+    self.profile = None
     super().__init__([])
     self.reload()
     urwid.register_signal(ProfilePage, ["dialog_open", "dialog_close"])
@@ -19,49 +20,98 @@ class ProfilePage(urwid.Columns):
     urwid.emit_signal(self, "dialog_open", dialog)
 
   def edit_info(self, button, user_data):
-    try:
-      email = user_data.email.get_value()
-      if email != self.profile["email"]:
-        self.client.update_email(email)
-      name = user_data.name.get_value()
-      division = user_data.division.get_value()
-      if name != self.profile["name"] or division != self.profile["division"]:
-        self.client.update_account(name=name, division=division)
-    except Exception as e:
-      self.msg(msg=e, title="Error")
-    finally:
-      self.reload()
+    self.worker.run(self._edit_info,
+      user_data.email.get_value(),
+      user_data.name.get_value(),
+      user_data.division.get_value(),
+      on_done=self._edited,
+      on_error=self._edit_failed,
+    )
+
+  def _edit_info(self, email, name, division):
+    changes = {}
+    if email != self.profile["email"]:
+      self.client.update_email(email)
+      changes["email"] = email
+    if name != self.profile["name"] or division != self.profile["division"]:
+      self.client.update_account(name=name, division=division)
+      changes.update(name=name, division=division)
+    return changes
+
+  def _edited(self, changes):
+    if not changes:
+      return
+    self.profile = {**self.profile, **changes}
+    self.show_profile()
+    # places and scores depend on the division, fetch the real values
+    self.revalidate()
+
+  def _edit_failed(self, error):
+    self.msg(msg=error, title="Error")
+    self.revalidate()
+
+  def revalidate(self):
+    self.worker.run(self.client.private_profile, on_done=self._revalidated)
+
+  def _revalidated(self, profile):
+    self.profile = profile
+    self.show_profile()
 
   def dialog_close(self, *args, **kwargs):
     urwid.emit_signal(self, "dialog_close")
 
   def reload(self):
-    self.profile = self.client.private_profile()
+    if self.profile is None:
+      self.contents = [(Placeholder(), self.options())]
+    self.worker.run(self._fetch, on_done=self._loaded, on_error=self._failed)
+
+  def _fetch(self):
+    profile = self.client.private_profile()
+    members = self.client.get_members() if self.client.config["userMembers"] else None
+    return profile, members
+
+  def _failed(self, error):
+    if self.profile is None:
+      self.contents = [(Placeholder(str(error), title="Error", title_align="left"), self.options())]
+    else:
+      self.msg(msg=error, title="Error")
+
+  def _loaded(self, result):
+    self.profile, members = result
     self.token = ProfileToken(self.profile["teamToken"])
     self.info = ProfileInfo(self.profile, self.client.config["divisions"], self.edit_info)
     left_widgets = [
       self.token,
       self.info,
     ]
-    if self.client.config["userMembers"]:
-      self.members = TeamMembers(self.client, on_msg=self.msg, reload=self.reload)
+    if members is not None:
+      self.members = TeamMembers(self.client, self.worker, members, on_msg=self.msg)
       left_widgets.append(self.members)
     self.left_column = urwid.ListBox(left_widgets)
-    self.solves = ProfileSolves(self.profile)
-    self.solves.set_title("Solves (S)")
-    self.right_column = urwid.Pile([
-      ("pack", ProfileSummary(self.profile, self.client.config["divisions"])),
-      self.solves,
-    ])
+    self.right_column = urwid.Pile([])
+    self.show_profile()
     self.contents = [
       (self.left_column, self.options()),
       (self.right_column, self.options()),
     ]
     self.set_focus(0)
 
+  def show_profile(self):
+    # only the read-only summary and solves are rebuilt, the forms on the
+    # left keep their focus and contents
+    self.solves = ProfileSolves(self.profile)
+    self.solves.set_title("Solves (S)")
+    self.right_column.contents = [
+      (ProfileSummary(self.profile, self.client.config["divisions"]), self.right_column.options("pack")),
+      (self.solves, self.right_column.options()),
+    ]
+    self.right_column.focus_position = 1
+
   def keypress(self, size, key):
     if super().keypress(size, key) is None:
       return
+    if self.profile is None:
+      return key
     if key == "t":
       self.token.copy()
     elif key == "i":
@@ -140,40 +190,52 @@ class ProfileInfo(urwid.LineBox):
     ]), title="Team Information (I)", title_align="left")
 
 class TeamMembers(urwid.LineBox):
-  def __init__(self, client, on_msg=None, reload=None):
+  def __init__(self, client, worker, members, on_msg=None):
     self.client = client
+    self.worker = worker
     self.on_msg = on_msg
-    self.reload = reload
-    members = self.client.get_members()
     self.email = TextBox("", "Add Member Email")
     urwid.connect_signal(self.email, "activate", self.add_member)
-    if len(members) == 0:
-      self.member_list = [urwid.Text("no members")]
-    else:
-      self.member_list = [TeamMemberRow(member, on_delete=self.remove_member) for member in members]
-    super().__init__(urwid.Pile([
+    self.pile = urwid.Pile([
       self.email,
       urwid.Divider("─"),
-      *self.member_list,
-    ]), title="Team Members (M)", title_align="left")
+    ])
+    self.set_members(members)
+    super().__init__(self.pile, title="Team Members (M)", title_align="left")
+
+  def set_members(self, members):
+    self.members = list(members)
+    if len(self.members) == 0:
+      self.member_list = [urwid.Text("no members")]
+    else:
+      self.member_list = [TeamMemberRow(member, on_delete=self.remove_member) for member in self.members]
+    self.pile.contents = self.pile.contents[:2] + [(row, self.pile.options()) for row in self.member_list]
 
   def add_member(self, *args, **kwargs):
-    try:
-      self.client.add_member(self.email.get_value())
-      if self.reload:
-        self.reload()
-    except Exception as e:
-      if self.on_msg:
-        self.on_msg(msg=e, title="Error")
+    self.worker.run(self.client.add_member, self.email.get_value(), on_done=self._added, on_error=self._error)
 
   def remove_member(self, button, user_data):
-    try:
-      self.client.remove_member(user_data)
-      if self.reload:
-        self.reload()
-    except Exception as e:
-      if self.on_msg:
-        self.on_msg(msg=e, title="Error")
+    self.worker.run(self.client.remove_member, user_data,
+      on_done=lambda result: self._removed(user_data),
+      on_error=self._error,
+    )
+
+  def _added(self, member):
+    self.email.edit.set_edit_text("")
+    if isinstance(member, dict) and "id" in member:
+      self.set_members(self.members + [member])
+    self.revalidate()
+
+  def _removed(self, id):
+    self.set_members([member for member in self.members if member["id"] != id])
+    self.revalidate()
+
+  def revalidate(self):
+    self.worker.run(self.client.get_members, on_done=self.set_members)
+
+  def _error(self, error):
+    if self.on_msg:
+      self.on_msg(msg=error, title="Error")
 
 class TeamMemberRow(urwid.Columns):
   def __init__(self, member, on_delete=None):
@@ -1,13 +1,25 @@
+import collections
+
 import urwid
 from urwid.command_map import (CURSOR_LEFT, CURSOR_RIGHT, ACTIVATE)
 
-from .components import Dialog, RadioBox
+from .components import Dialog, Placeholder, RadioBox
 from .profile import ProfileSummary, ProfileSolves
+from ..leaderboard import Leaderboard
+
+# rows kept built around the visible window
+ROW_CACHE_SIZE = 256
+# fetch the next page once focus is this close to the end of what is loaded
+PREFETCH_DISTANCE = 50
+PAGE_SIZE = 100
+# leaderboard pages kept in memory, the ones furthest from focus are dropped
+MAX_PAGES = 50
 
 class ScoreboardPage(urwid.Columns):
-  def __init__(self, client, config):
+  def __init__(self, client, config, worker):
     self.client = client
     self.config = config
+    self.worker = worker
     self.division = self.config.get("scoreboard_division", None)
     super().__init__([])
     self.reload()
@@ -25,11 +37,28 @@ class ScoreboardPage(urwid.Columns):
     return super().keypress(size, key)
 
   def show_team(self, id):
-    box = (PublicProfile(self.client, id, self.hide_team), self.options())
+    self.team = id
+    self.contents = [self.contents[0], (Placeholder(), self.options())]
+    self.set_focus(1)
+    self.worker.run(self.client.public_profile, id,
+      on_done=lambda data: self._show_team(id, data),
+      on_error=lambda e: self._show_team_error(id, e),
+    )
+
+  def _show_team(self, id, data):
+    if self.team != id or len(self.contents) < 2:
+      return
+    box = (PublicProfile(self.client, data, self.hide_team), self.options())
     self.contents = [self.contents[0], box]
     self.set_focus(1)
 
+  def _show_team_error(self, id, error):
+    if self.team != id or len(self.contents) < 2:
+      return
+    self.contents = [self.contents[0], (Placeholder(str(error), title="Error", title_align="left"), self.options())]
+
   def hide_team(self, widget):
+    self.team = None
     self.contents = [self.contents[0]]
 
   def save_division(self, button, user_data):
@@ -45,7 +74,29 @@ class ScoreboardPage(urwid.Columns):
     urwid.emit_signal(self, "dialog_close")
 
   def reload(self):
-    self.contents = [(Scoreboard(self.client, self.division, self.show_team), self.options())]
+    self.team = None
+    self.contents = [(Placeholder(), self.options())]
+    division = self.division
+    self.worker.run(self._fetch, division,
+      on_done=lambda data: self._loaded(division, data),
+      on_error=lambda e: self._failed(division, e),
+    )
+
+  def _fetch(self, division):
+    # resolve the lazily loaded client config off the main loop as well
+    self.client.config
+    return self.client.get_scoreboard(division=division, limit=PAGE_SIZE)
+
+  def _loaded(self, division, data):
+    if division != self.division:
+      return
+    scoreboard = Scoreboard(self.client, self.worker, data, division, self.show_team)
+    self.contents = [(scoreboard, self.options())] + self.contents[1:]
+
+  def _failed(self, division, error):
+    if division != self.division:
+      return
+    self.contents = [(Placeholder(str(error), title="Error", title_align="left"), self.options())]
 
 class FilterDialog(Dialog):
   def __init__(self, divisions, selected=None, on_save=None, on_cancel=None):
@@ -70,10 +121,9 @@ class FilterDialog(Dialog):
       return super().keypress(size, key)
 
 class Scoreboard(urwid.LineBox):
-  def __init__(self, client, division=None, on_select=None):
+  def __init__(self, client, worker, data, division=None, on_select=None):
     self.division = division
     self.on_select = on_select
-    data = client.get_scoreboard(division=self.division)
     if len(data["leaderboard"]) == 0:
       content = urwid.ListBox([urwid.Text("No teams")])
     else:
@@ -85,7 +135,7 @@ class Scoreboard(urwid.LineBox):
         ], dividechars=1),
         urwid.Divider("─"),
       ])
-      content = urwid.Frame(urwid.ListBox(ScoreboardWalker(client, data, self.division, self._on_select)), header=header)
+      content = urwid.Frame(urwid.ListBox(ScoreboardWalker(client, worker, data, self.division, self._on_select)), header=header)
     title = "All Divisions" if self.division is None else f"{client.config['divisions'][self.division]} Division"
     title += " (F)"
     super().__init__(content, title=title, title_align="left")
@@ -98,22 +148,49 @@ class Scoreboard(urwid.LineBox):
     return super().keypress(size, key)
 
 class ScoreboardWalker(urwid.ListWalker):
-  def __init__(self, client, data, division, on_select=None):
+  def __init__(self, client, worker, data, division, on_select=None):
     self.client = client
+    self.worker = worker
     self.on_select = on_select
-    self.leaderboard, self.total = data["leaderboard"], data["total"]
+    self.total = data["total"]
+    self.leaderboard = Leaderboard(self.total, page_size=PAGE_SIZE, max_pages=MAX_PAGES)
+    self.leaderboard.add(0, data["leaderboard"])
+    self.rank_width = len(str(self.total))+1
+    self.score_width = len(str(data["leaderboard"][0]["score"]))+1
     self.focus = 0
     self.division = division
+    self.fetching = set()
+    self.rows = collections.OrderedDict()
 
   def __getitem__(self, key):
-    if key >= len(self.leaderboard):
-      data = self.client.get_scoreboard(
-        division=self.division,
-        offset=len(self.leaderboard)
-      )
-      self.leaderboard.extend(data["leaderboard"])
+    row = self.rows.get(key)
+    if row is not None:
+      self.rows.move_to_end(key)
+      return row
+    team = self.leaderboard.get(key)
+    if team is None:
+      self.fetch(key)
+      return LoadingRow()
+    row = self.rows[key] = ScoreboardRow(key, team, self.rank_width, self.score_width, self._on_select)
+    if len(self.rows) > ROW_CACHE_SIZE:
+      self.rows.popitem(last=False)
+    return row
+
+  def fetch(self, position):
+    offset = self.leaderboard.page_offset(position)
+    if offset in self.fetching or offset >= self.total or self.leaderboard.loaded(offset):
+      return
+    self.fetching.add(offset)
+    self.worker.run(self.client.get_scoreboard, division=self.division, limit=PAGE_SIZE, offset=offset,
+      on_done=lambda data: self._fetched(offset, data),
+      on_error=lambda e: self._fetched(offset, None),
+    )
 
-    return ScoreboardRow(self.leaderboard, self.total, key, self._on_select)
+  def _fetched(self, offset, data):
+    self.fetching.discard(offset)
+    if data is not None:
+      self.leaderboard.add(offset, data["leaderboard"], keep=self.focus)
+      self._modified()
 
   def _on_select(self, row):
     if self.on_select:
@@ -134,16 +211,19 @@ class ScoreboardWalker(urwid.ListWalker):
 
   def set_focus(self, focus):
     self.focus = focus
+    for position in (focus + PREFETCH_DISTANCE, focus - PREFETCH_DISTANCE):
+      if 0 <= position < self.total and not self.leaderboard.loaded(position):
+        self.fetch(position)
     self._modified()
 
 class ScoreboardRow(urwid.WidgetWrap):
-  def __init__(self, leaderboard, total, key, on_select=None):
+  def __init__(self, key, team, rank_width, score_width, on_select=None):
     self.contents = [
-      (len(str(total))+1, urwid.Text(str(key+1))),
-      urwid.Text(leaderboard[key]["name"]),
-      (len(str(leaderboard[0]["score"]))+1, urwid.Text(str(leaderboard[key]["score"]))),
+      (rank_width, urwid.Text(str(key+1))),
+      urwid.Text(team["name"]),
+      (score_width, urwid.Text(str(team["score"]))),
     ]
-    self.id = leaderboard[key]["id"]
+    self.id = team["id"]
     self.on_select = on_select
     self._columns = urwid.Columns(self.contents, dividechars=1)
     self._focusable_columns = urwid.AttrMap(self._columns, "", "highlight")
@@ -157,10 +237,19 @@ class ScoreboardRow(urwid.WidgetWrap):
       self.on_select(self)
     return key
 
+class LoadingRow(urwid.Text):
+  def __init__(self):
+    super().__init__("Loading...")
+
+  def selectable(self):
+    return True
+
+  def keypress(self, size, key):
+    return key
+
 class PublicProfile(urwid.Pile):
-  def __init__(self, client, id, on_leave=None):
+  def __init__(self, client, data, on_leave=None):
     self.on_leave = on_leave
-    data = client.public_profile(id)
     widgets = [
       ("pack", ProfileSummary(data, client.config["divisions"])),
       ProfileSolves(data),
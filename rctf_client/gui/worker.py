@@ -0,0 +1,92 @@
+import collections
+import concurrent.futures
+import os
+import queue
+import threading
+
+class Worker:
+  def __init__(self, jobs=4):
+    self.jobs = queue.Queue()
+    self.lock = threading.Lock()
+    self.pending = set()
+    self.done = collections.deque()
+    self.pipe = None
+    # daemon threads, so quitting the TUI does not wait for downloads or
+    # prefetches that are still running
+    for _ in range(jobs):
+      threading.Thread(target=self._work, daemon=True).start()
+
+  def attach(self, loop):
+    # results are handed back to the urwid main loop through a pipe so that
+    # widgets are only ever touched from the main thread
+    pipe = loop.watch_pipe(self._dispatch)
+    with self.lock:
+      self.pipe = pipe
+    self._dispatch(b"")
+
+  def shutdown(self):
+    with self.lock:
+      pipe, self.pipe = self.pipe, None
+      pending = list(self.pending)
+    for future in pending:
+      future.cancel()
+    if pipe is not None:
+      os.close(pipe)
+
+  def run(self, fn, *args, on_done=None, on_error=None, **kwargs):
+    future = concurrent.futures.Future()
+    with self.lock:
+      self.pending.add(future)
+    future.add_done_callback(lambda future: self._complete(future, on_done, on_error))
+    self.jobs.put((future, fn, args, kwargs))
+    return future
+
+  def drain(self):
+    # without a main loop: wait for every job, including ones started by
+    # callbacks, and run the callbacks on this thread
+    while True:
+      with self.lock:
+        pending = list(self.pending)
+        if not pending and not self.done:
+          return
+      concurrent.futures.wait(pending)
+      self._dispatch(b"")
+
+  def _work(self):
+    while True:
+      future, fn, args, kwargs = self.jobs.get()
+      if not future.set_running_or_notify_cancel():
+        continue
+      try:
+        result = fn(*args, **kwargs)
+      except BaseException as e:
+        future.set_exception(e)
+      else:
+        future.set_result(result)
+
+  def _complete(self, future, on_done, on_error):
+    with self.lock:
+      self.pending.discard(future)
+      self.done.append((future, on_done, on_error))
+      pipe = self.pipe
+    if pipe is not None:
+      try:
+        os.write(pipe, b"\n")
+      except OSError:
+        pass
+
+  def _dispatch(self, data):
+    while True:
+      with self.lock:
+        if not self.done:
+          break
+        future, on_done, on_error = self.done.popleft()
+      if future.cancelled():
+        continue
+      error = future.exception()
+      if error is None:
+        if on_done:
+          on_done(future.result())
+      elif on_error:
+        on_error(error)
+    return True
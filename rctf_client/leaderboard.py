@@ -0,0 +1,48 @@
+import array
+import sys
+
+class Page:
+  __slots__ = ["ids", "names", "scores"]
+
+  def __init__(self, entries):
+    self.ids = [sys.intern(entry["id"]) for entry in entries]
+    self.names = [sys.intern(entry["name"]) for entry in entries]
+    self.scores = array.array("q", (entry["score"] for entry in entries))
+
+  def __len__(self):
+    return len(self.ids)
+
+class Leaderboard:
+  def __init__(self, total, page_size=100, max_pages=None):
+    self.total = total
+    self.page_size = page_size
+    self.max_pages = max_pages
+    self.pages = {}
+
+  def page_offset(self, position):
+    return position - position % self.page_size
+
+  def loaded(self, position):
+    page = self.pages.get(position // self.page_size)
+    return page is not None and position % self.page_size < len(page)
+
+  def add(self, offset, entries, keep=None):
+    if offset % self.page_size != 0:
+      raise ValueError(f"Offset {offset} is not a multiple of the page size")
+    self.pages[offset // self.page_size] = Page(entries)
+    if self.max_pages is not None and len(self.pages) > self.max_pages:
+      # drop the pages furthest from the position being looked at
+      keep = offset if keep is None else keep
+      center = keep // self.page_size
+      for index in sorted(self.pages, key=lambda index: -abs(index - center))[:len(self.pages) - self.max_pages]:
+        del self.pages[index]
+
+  def get(self, position):
+    page = self.pages.get(position // self.page_size)
+    i = position % self.page_size
+    if page is None or i >= len(page):
+      return None
+    return {"id": page.ids[i], "name": page.names[i], "score": page.scores[i]}
+
+  def __len__(self):
+    return sum(len(page) for page in self.pages.values())
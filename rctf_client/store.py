@@ -0,0 +1,286 @@
+import json
+import sqlite3
+import threading
+import time
+
+from .exceptions import OfflineError
+
+STORE_FILE = ".rctf.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+  key TEXT PRIMARY KEY,
+  value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS challenges (
+  id TEXT PRIMARY KEY,
+  name TEXT NOT NULL,
+  category TEXT NOT NULL,
+  author TEXT,
+  description TEXT,
+  points INTEGER NOT NULL,
+  solves INTEGER NOT NULL,
+  sort_weight INTEGER NOT NULL,
+  position INTEGER NOT NULL,
+  files TEXT NOT NULL,
+  updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS challenges_category ON challenges (category);
+CREATE INDEX IF NOT EXISTS challenges_points ON challenges (points);
+CREATE TABLE IF NOT EXISTS solves (
+  id TEXT PRIMARY KEY,
+  created_at INTEGER
+);
+CREATE TABLE IF NOT EXISTS profiles (
+  id TEXT PRIMARY KEY,
+  own INTEGER NOT NULL,
+  data TEXT NOT NULL,
+  updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+  id INTEGER PRIMARY KEY,
+  division TEXT,
+  total INTEGER NOT NULL,
+  taken_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_division ON snapshots (division, taken_at);
+CREATE TABLE IF NOT EXISTS snapshot_entries (
+  snapshot INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+  rank INTEGER NOT NULL,
+  team_id TEXT NOT NULL,
+  name TEXT NOT NULL,
+  score INTEGER NOT NULL,
+  PRIMARY KEY (snapshot, rank)
+);
+CREATE INDEX IF NOT EXISTS snapshot_entries_team ON snapshot_entries (team_id);
+"""
+
+# pages fetched within this many seconds of a snapshot belong to it
+SNAPSHOT_WINDOW = 60
+
+def _challenge(row):
+  return {
+    "id": row["id"],
+    "name": row["name"],
+    "category": row["category"],
+    "author": row["author"],
+    "description": row["description"],
+    "points": row["points"],
+    "solves": row["solves"],
+    "sortWeight": row["sort_weight"],
+    "files": json.loads(row["files"]),
+  }
+
+class Store:
+  def __init__(self, path):
+    self.db = sqlite3.connect(str(path), check_same_thread=False)
+    self.db.row_factory = sqlite3.Row
+    self.lock = threading.Lock()
+    with self.lock, self.db:
+      self.db.execute("PRAGMA foreign_keys = ON")
+      self.db.executescript(SCHEMA)
+
+  def close(self):
+    self.db.close()
+
+  def get_meta(self, key):
+    with self.lock:
+      row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return json.loads(row["value"]) if row else None
+
+  def set_meta(self, key, value):
+    with self.lock, self.db:
+      self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+  def upsert_challenges(self, challenges):
+    now = time.time()
+    rows = [(
+      challenge["id"], challenge["name"], challenge["category"], challenge.get("author"),
+      challenge.get("description"), challenge["points"], challenge["solves"],
+      challenge.get("sortWeight", 0), position, json.dumps(challenge["files"]), now,
+    ) for position, challenge in enumerate(challenges)]
+    with self.lock, self.db:
+      self.db.executemany("""
+        INSERT OR REPLACE INTO challenges (id, name, category, author, description, points, solves, sort_weight, position, files, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+      """, rows)
+      # challenges hidden since the last sync
+      self.db.execute("DELETE FROM challenges WHERE updated_at < ?", (now,))
+
+  def challenge(self, id):
+    with self.lock:
+      row = self.db.execute("SELECT * FROM challenges WHERE id = ?", (id,)).fetchone()
+    return _challenge(row) if row else None
+
+  def challenges(self, categories=None, solved=None, min_points=None, max_points=None):
+    query = "SELECT * FROM challenges WHERE 1"
+    params = []
+    if categories:
+      query += f" AND category IN ({', '.join('?' * len(categories))})"
+      params += list(categories)
+    if solved is not None:
+      query += f" AND id {'IN' if solved else 'NOT IN'} (SELECT id FROM solves)"
+    if min_points is not None:
+      query += " AND points >= ?"
+      params.append(min_points)
+    if max_points is not None:
+      query += " AND points <= ?"
+      params.append(max_points)
+    query += " ORDER BY sort_weight DESC, position"
+    with self.lock:
+      return [_challenge(row) for row in self.db.execute(query, params)]
+
+  def categories(self):
+    with self.lock:
+      return [row["category"] for row in self.db.execute("SELECT DISTINCT category FROM challenges ORDER BY category")]
+
+  def set_profile(self, profile, own=False):
+    with self.lock, self.db:
+      self.db.execute("INSERT OR REPLACE INTO profiles (id, own, data, updated_at) VALUES (?, ?, ?, ?)",
+        (profile["id"], int(own), json.dumps(profile), time.time()))
+      if own:
+        self.db.execute("UPDATE profiles SET own = 0 WHERE id != ?", (profile["id"],))
+        self.db.execute("DELETE FROM solves")
+        self.db.executemany("INSERT OR REPLACE INTO solves (id, created_at) VALUES (?, ?)",
+          [(solve["id"], solve.get("createdAt")) for solve in profile["solves"]])
+
+  def profile(self, id=None):
+    with self.lock:
+      if id is None:
+        row = self.db.execute("SELECT data FROM profiles WHERE own = 1").fetchone()
+      else:
+        row = self.db.execute("SELECT data FROM profiles WHERE id = ?", (id,)).fetchone()
+    return json.loads(row["data"]) if row else None
+
+  def solved(self):
+    with self.lock:
+      return set(row["id"] for row in self.db.execute("SELECT id FROM solves"))
+
+  def add_scoreboard(self, division, data, offset=0):
+    now = time.time()
+    with self.lock, self.db:
+      snapshot = None
+      if offset > 0:
+        row = self.db.execute("""
+          SELECT id FROM snapshots WHERE division IS ? AND taken_at > ?
+          ORDER BY taken_at DESC LIMIT 1
+        """, (division, now - SNAPSHOT_WINDOW)).fetchone()
+        snapshot = row["id"] if row else None
+      if snapshot is None:
+        snapshot = self.db.execute("INSERT INTO snapshots (division, total, taken_at) VALUES (?, ?, ?)",
+          (division, data["total"], now)).lastrowid
+      self.db.executemany("""
+        INSERT OR REPLACE INTO snapshot_entries (snapshot, rank, team_id, name, score)
+        VALUES (?, ?, ?, ?, ?)
+      """, [(snapshot, offset + i, team["id"], team["name"], team["score"]) for i, team in enumerate(data["leaderboard"])])
+
+  def scoreboard(self, division=None, limit=100, offset=0):
+    with self.lock:
+      snapshot = self.db.execute("""
+        SELECT * FROM snapshots WHERE division IS ? ORDER BY taken_at DESC LIMIT 1
+      """, (division,)).fetchone()
+      if snapshot is None:
+        return None
+      rows = self.db.execute("""
+        SELECT team_id, name, score FROM snapshot_entries
+        WHERE snapshot = ? AND rank >= ? ORDER BY rank LIMIT ?
+      """, (snapshot["id"], offset, limit)).fetchall()
+    return {
+      "total": snapshot["total"],
+      "leaderboard": [{"id": row["team_id"], "name": row["name"], "score": row["score"]} for row in rows],
+    }
+
+class StoreClient:
+  def __init__(self, client, store, offline=False, index_ttl=30):
+    self.client = client
+    self.store = store
+    self.offline = offline
+    self.index_ttl = index_ttl
+    self._index = None
+
+  def _offline(self, name, data):
+    if data is None:
+      raise OfflineError(f"No {name} stored for offline use")
+    return data
+
+  @property
+  def config(self):
+    if self.offline:
+      return self._offline("client config", self.store.get_meta("config"))
+    config = self.client.config
+    self.store.set_meta("config", config)
+    return config
+
+  def get_challenges(self):
+    if self.offline:
+      return self._offline("challenges", self.store.challenges() or None)
+    challenges = self.client.get_challenges()
+    self.store.upsert_challenges(challenges)
+    return challenges
+
+  def _challenge_index(self, max_age=None):
+    from .client import ChallengeIndex
+    if max_age is None:
+      max_age = self.index_ttl
+    # built from get_challenges so that every refresh is stored
+    if self._index is None or self._index.age() > max_age:
+      self._index = ChallengeIndex(self.get_challenges())
+    return self._index
+
+  def get_challenge(self, chall):
+    from .client import INDEX_MISS_AGE
+    if self.offline:
+      return self.store.challenge(chall)
+    index = self._challenge_index()
+    if chall not in index.by_id and index.age() > INDEX_MISS_AGE:
+      index = self._challenge_index(max_age=0)
+    return index.by_id.get(chall)
+
+  def get_challenges_by_category(self):
+    if self.offline:
+      by_category = {}
+      for challenge in self._offline("challenges", self.store.challenges() or None):
+        by_category.setdefault(challenge["category"], []).append(challenge)
+      return by_category
+    return self._challenge_index().by_category
+
+  def submit_flag(self, chall, flag):
+    if self.offline:
+      raise OfflineError("submit_flag is not available offline")
+    data = self.client.submit_flag(chall, flag)
+    # solve counts have changed
+    self._index = None
+    return data
+
+  def private_profile(self):
+    if self.offline:
+      return self._offline("profile", self.store.profile())
+    profile = self.client.private_profile()
+    self.store.set_profile(profile, own=True)
+    return profile
+
+  def public_profile(self, uuid):
+    if self.offline:
+      return self._offline("profile", self.store.profile(uuid))
+    profile = self.client.public_profile(uuid)
+    self.store.set_profile(profile)
+    return profile
+
+  def get_scoreboard(self, division=None, limit=100, offset=0):
+    if self.offline:
+      return self._offline("scoreboard", self.store.scoreboard(division, limit, offset))
+    data = self.client.get_scoreboard(division=division, limit=limit, offset=offset)
+    self.store.add_scoreboard(division, data, offset)
+    return data
+
+  def query_challenges(self, categories=None, solved=None, min_points=None, max_points=None):
+    if not self.offline:
+      self.get_challenges()
+      if solved is not None:
+        self.private_profile()
+    return self.store.challenges(categories, solved, min_points, max_points)
+
+  def __getattr__(self, name):
+    if self.offline:
+      raise OfflineError(f"{name} is not available offline")
+    return getattr(self.client, name)
@@ -0,0 +1,84 @@
+import json
+import math
+import threading
+from collections import namedtuple
+
+RequestTrace = namedtuple("RequestTrace", ["method", "endpoint", "status", "kind", "bytes", "elapsed"])
+
+def percentile(values, pct):
+  values = sorted(values)
+  return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+class Tracer:
+  def __init__(self):
+    self.traces = []
+    self.lock = threading.Lock()
+
+  def __call__(self, trace):
+    with self.lock:
+      self.traces.append(trace)
+
+  def endpoints(self):
+    with self.lock:
+      traces = list(self.traces)
+    groups = {}
+    for trace in traces:
+      groups.setdefault((trace.method, trace.endpoint), []).append(trace)
+    stats = []
+    for (method, endpoint), group in sorted(groups.items(), key=lambda x: (x[0][1], x[0][0])):
+      elapsed = [trace.elapsed for trace in group]
+      stats.append({
+        "method": method,
+        "endpoint": endpoint,
+        "count": len(group),
+        "bytes": sum(trace.bytes for trace in group),
+        "p50": percentile(elapsed, 50),
+        "p95": percentile(elapsed, 95),
+        "max": max(elapsed),
+        "total": sum(elapsed),
+      })
+    return stats
+
+  def summary(self):
+    stats = self.endpoints()
+    if len(stats) == 0:
+      return "No requests"
+    rows = [("Endpoint", "Count", "p50", "p95", "Max")]
+    for stat in stats:
+      rows.append((
+        f"{stat['method']} {stat['endpoint']}",
+        str(stat["count"]),
+        *(f"{stat[k] * 1000:.1f}ms" for k in ["p50", "p95", "max"]),
+      ))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join(
+      "  ".join([row[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])])
+      for row in rows
+    )
+
+  def to_json(self):
+    return json.dumps({"endpoints": self.endpoints()}, indent=2)
+
+  def to_prometheus(self):
+    lines = [
+      "# HELP rctf_client_requests_total Requests made to the rCTF API",
+      "# TYPE rctf_client_requests_total counter",
+      "# HELP rctf_client_request_bytes_total Response bytes received from the rCTF API",
+      "# TYPE rctf_client_request_bytes_total counter",
+      "# HELP rctf_client_request_seconds Request latency",
+      "# TYPE rctf_client_request_seconds summary",
+    ]
+    for stat in self.endpoints():
+      labels = f'method="{stat["method"]}",endpoint="{stat["endpoint"]}"'
+      lines.append(f"rctf_client_requests_total{{{labels}}} {stat['count']}")
+      lines.append(f"rctf_client_request_bytes_total{{{labels}}} {stat['bytes']}")
+      lines.append(f'rctf_client_request_seconds{{{labels},quantile="0.5"}} {stat["p50"]}')
+      lines.append(f'rctf_client_request_seconds{{{labels},quantile="0.95"}} {stat["p95"]}')
+      lines.append(f"rctf_client_request_seconds_sum{{{labels}}} {stat['total']}")
+      lines.append(f"rctf_client_request_seconds_count{{{labels}}} {stat['count']}")
+    return "\n".join(lines) + "\n"
+
+  def dump(self, path):
+    data = self.to_json() if str(path).endswith(".json") else self.to_prometheus()
+    with open(path, "w") as f:
+      f.write(data)
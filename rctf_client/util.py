@@ -1,8 +1,7 @@
+import os
 import re
 import pathlib
-import requests
-import shutil
-import urllib
+import tempfile
 
 def ordinal_suffix(i):
   j = i % 10
@@ -21,45 +20,132 @@ def safe_name(name):
   name = re.sub("^\.\.?$", "_", name)
   return name
 
+# (name, start directory) -> file found by find_file in this process
+_found_files = {}
+
 def find_file(name, path=None):
   if path is None:
     path = pathlib.Path.cwd().resolve()
+  fp = _found_files.get((name, path))
+  if fp is not None and fp.is_file():
+    return fp
   dirs = [path] + list(path.parents)
   for directory in dirs:
     fp = directory / name
     if fp.is_file():
+      _found_files[name, path] = fp
       return fp
   raise FileNotFoundError(f"No such file: '{name}'")
 
 def cwd_from_file(path):
   return pathlib.Path.cwd().resolve().relative_to(path)
 
+class ChallengeDirs:
+  # path <-> challenge ID lookups over config["challenge_dirs"], which stays
+  # the single source of truth and is updated in place
+  def __init__(self, config):
+    self.config = config
+    self.by_path = config.get("challenge_dirs", {})
+    self._by_id = None
+    self._trie = None
+
+  @property
+  def by_id(self):
+    if self._by_id is None:
+      self._by_id = {}
+      for path, id in self.by_path.items():
+        self._by_id.setdefault(id, path)
+    return self._by_id
+
+  @property
+  def trie(self):
+    # nested dicts keyed by path component, the None key holds the ID of the
+    # challenge directory ending at that node
+    if self._trie is None:
+      self._trie = {}
+      for path, id in self.by_path.items():
+        self._insert(path, id)
+    return self._trie
+
+  def _insert(self, path, id):
+    node = self._trie
+    for part in pathlib.PurePath(path).parts:
+      node = node.setdefault(part, {})
+    node.setdefault(None, id)
+
+  def add(self, path, id):
+    path = str(path)
+    if path in self.by_path:
+      # the first challenge to claim a directory keeps it
+      return False
+    self.by_path[path] = id
+    self.config.setdefault("challenge_dirs", self.by_path)
+    if self._by_id is not None:
+      self._by_id.setdefault(id, path)
+    if self._trie is not None:
+      self._insert(path, id)
+    return True
+
+  def id(self, path):
+    return self.by_path.get(str(path))
+
+  def path(self, id):
+    return self.by_id.get(id)
+
+  def resolve(self, path):
+    # ID of the deepest challenge directory containing path
+    node, found = self.trie, None
+    for part in pathlib.PurePath(path).parts:
+      node = node.get(part)
+      if node is None:
+        break
+      found = node.get(None, found)
+    return found
+
 def make_challengedir(ctf_root, config, challenge):
   category = safe_name(challenge["category"])
   directory = safe_name(challenge["name"])
   challenge_root = ctf_root / category / directory
   challenge_root.mkdir(parents=True, exist_ok=True)
-  config["challenge_dirs"] = {
-    str(challenge_root.relative_to(ctf_root)): challenge["id"],
-    **config.get("challenge_dirs", {})
-  }
+  ChallengeDirs(config).add(challenge_root.relative_to(ctf_root), challenge["id"])
   return challenge_root
 
-def download_challenge(ctf_root, config, challenge):
-  challenge_root = make_challengedir(ctf_root, config, challenge)
-
-  with open(challenge_root / "description.md", "w") as f:
-    f.write(f"""# {challenge["category"]}/{challenge["name"]} (ID: {challenge["id"]})
+def write_description(challenge_root, challenge):
+  description = f"""# {challenge["category"]}/{challenge["name"]} (ID: {challenge["id"]})
 ## Author: {challenge["author"]}
 
 {challenge["description"]}
-""")
-
-  if challenge["files"]:
-    files_dir = challenge_root / "files"
-    files_dir.mkdir(parents=True, exist_ok=True)
-    for challenge_file in challenge["files"]:
-      url = urllib.parse.urljoin(config["url"], challenge_file["url"])
-      with requests.get(url, stream=True) as stream:
-        with open(files_dir / safe_name(challenge_file["name"]), "wb") as fw:
-          shutil.copyfileobj(stream.raw, fw)
\ No newline at end of file
+"""
+  path = challenge_root / "description.md"
+  try:
+    if path.read_text() == description:
+      return
+  except OSError:
+    pass
+  with open(path, "w") as f:
+    f.write(description)
+
+def parse_size(size):
+  units = {"": 1, "k": 1 << 10, "m": 1 << 20, "g": 1 << 30}
+  match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmg]?)i?b?\s*", size.lower())
+  if not match:
+    raise ValueError(f"Invalid size: {size}")
+  return int(float(match.group(1)) * units[match.group(2)])
+
+def format_size(size):
+  for unit in ["B", "KiB", "MiB"]:
+    if size < 1024:
+      return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+    size /= 1024
+  return f"{size:.1f} GiB"
+
+def atomic_write(path, data):
+  path = pathlib.Path(path)
+  fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+  try:
+    with os.fdopen(fd, "w") as f:
+      f.write(data)
+    os.replace(tmp, path)
+  except:
+    os.unlink(tmp)
+    raise
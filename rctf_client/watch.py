@@ -0,0 +1,75 @@
+import time
+
+from .exceptions import APIError
+
+def snapshot(challenges, profile):
+  return {
+    "challenges": {
+      challenge["id"]: {k: challenge[k] for k in ["name", "category", "points", "solves"]}
+      for challenge in challenges
+    },
+    "solves": set(solve["id"] for solve in profile["solves"]),
+  }
+
+def diff(old, new):
+  events = []
+  old_challenges, new_challenges = old["challenges"], new["challenges"]
+  for id, challenge in new_challenges.items():
+    before = old_challenges.get(id)
+    if before is None:
+      events.append({"event": "release", "id": id, **challenge})
+      continue
+    for field in ["points", "solves"]:
+      if before[field] != challenge[field]:
+        events.append({
+          "event": field, "id": id, "name": challenge["name"], "category": challenge["category"],
+          "old": before[field], "new": challenge[field],
+        })
+  for id, challenge in old_challenges.items():
+    if id not in new_challenges:
+      events.append({"event": "removed", "id": id, "name": challenge["name"], "category": challenge["category"]})
+  for id in new["solves"] - old["solves"]:
+    challenge = new_challenges.get(id, {})
+    events.append({"event": "team_solve", "id": id, "name": challenge.get("name"), "category": challenge.get("category")})
+  return events
+
+class AdaptiveInterval:
+  def __init__(self, minimum, maximum, factor=1.5):
+    self.minimum = minimum
+    self.maximum = maximum
+    self.factor = factor
+    self.current = minimum
+
+  def update(self, events):
+    if any(event["event"] == "release" for event in events):
+      self.current = self.minimum
+    elif len(events) == 0:
+      self.current = min(self.maximum, self.current * self.factor)
+    return self.current
+
+  def backoff(self):
+    self.current = min(self.maximum, self.current * 2)
+    return self.current
+
+def watch(client, minimum=10, maximum=300, sleep=time.sleep):
+  interval = AdaptiveInterval(minimum, maximum)
+  previous = None
+  while True:
+    try:
+      current = snapshot(client.get_challenges(), client.private_profile())
+    except APIError as e:
+      if e.kind != "badRateLimit":
+        raise
+      sleep(interval.backoff())
+      continue
+    except OSError as e:
+      yield [{"event": "error", "message": str(e)}]
+      sleep(interval.backoff())
+      continue
+    if previous is not None:
+      events = diff(previous, current)
+      interval.update(events)
+      if events:
+        yield events
+    previous = current
+    sleep(interval.current)